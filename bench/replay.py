@@ -0,0 +1,431 @@
+#################################
+# OFFLINE REPLAY BENCHMARK
+#################################
+# Replays saved Easy Apply steps (bench/fixtures/<name>/stepN.html) through
+# the bot's own process_job_cards / attempt_dynamic_navigation / fill path
+# against a local page, in headless Chrome, without network or a LinkedIn
+# session. Reports WebDriver commands and wall time per step plus the answer
+# cache hit rate per fixture, and appends every run to bench/history.jsonl.
+#
+#   python bench/replay.py [--fixture NAME] [--chrome-binary PATH] [--chromedriver PATH] [--profile]
+#
+# New fixtures come from a live run with RECORD_FIXTURES_DIR=bench/fixtures.
+import argparse
+import contextlib
+import io
+import json
+import os
+import re
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(BENCH_DIR)
+FIXTURES_DIR = os.path.join(BENCH_DIR, "fixtures")
+HISTORY_PATH = os.path.join(BENCH_DIR, "history.jsonl")
+sys.path.insert(0, REPO_DIR)
+
+import lnkedinbot as bot
+from selenium import webdriver
+from selenium.webdriver.chrome.service import Service
+
+COMMAND_BUDGET = 1500  # a fixture that needs more than this is reported as stuck
+
+#################################
+# 1) LOCAL REPLAY SITE
+#################################
+PAGE_TEMPLATE = """<!doctype html>
+<html><head><meta charset="utf-8"><title>Replay - __TITLE__</title></head>
+<body>
+<div class="jobs-search-results-list">
+  <div class="job-card-container" data-job-id="__JOB_ID__">
+    <a class="job-card-container__link" href="/jobs/view/__JOB_ID__/">__TITLE__</a>
+    <div class="artdeco-entity-lockup__subtitle">Replay Corp</div>
+    <ul class="job-card-list__footer-wrapper"><li class="job-card-container__footer-item">Easy Apply</li></ul>
+  </div>
+</div>
+<div id="details" hidden>
+  <h2>__TITLE__</h2>
+  <button class="jobs-apply-button artdeco-button artdeco-button--primary" type="button">Easy Apply</button>
+</div>
+<div id="modal-root"></div>
+<script>
+const STEPS = __STEPS__;
+const SUBMIT_DELAY_MS = __SUBMIT_DELAY__;
+__SHIM__
+</script>
+</body></html>
+"""
+
+# Stands in for LinkedIn's client-side behaviour: opens the recorded steps,
+# keeps the progress container node alive across steps (like the real modal),
+# refuses to advance while required fields are empty, and logs timestamps of
+# every transition to window.__replayLog. A fixture's "submit_delay_ms" (in
+# meta.json) empties the modal on Submit and shows the Done dialog only after
+# that delay, like a slow submission.
+REPLAY_SHIM = """
+(function() {
+    const log = window.__replayLog = [];
+    const mark = (event, step) => log.push({event: event, step: step, t: Date.now()});
+    const modalRoot = document.getElementById("modal-root");
+    const PROGRESS = "[aria-label*='Your job application progress is at ']";
+    const DONE = '<div role="dialog" class="artdeco-modal"><h2>Your application was sent</h2>' +
+        '<button class="artdeco-button artdeco-button--primary" type="button"><span>Done</span></button></div>';
+    let step = -1;
+    const render = i => {
+        const tpl = document.createElement("template");
+        tpl.innerHTML = STEPS[i];
+        const current = modalRoot.querySelector(PROGRESS);
+        const next = tpl.content.querySelector(PROGRESS);
+        if (current && next) {
+            current.setAttribute("aria-label", next.getAttribute("aria-label"));
+            current.innerHTML = next.innerHTML;
+        } else {
+            modalRoot.innerHTML = "";
+            modalRoot.appendChild(tpl.content);
+        }
+        step = i;
+        mark("step", i);
+    };
+    const close = event => {
+        modalRoot.innerHTML = "";
+        mark(event, step);
+        step = -1;
+    };
+    const missing = () => {
+        const empty = Array.from(modalRoot.querySelectorAll("input[type='text'][required], select[required], textarea[required]"))
+            .filter(el => el.tagName === "SELECT"
+                ? el.selectedIndex < 0 || /select an option/i.test(el.options[el.selectedIndex].text)
+                : !el.value.trim());
+        const radios = Array.from(modalRoot.querySelectorAll("fieldset"))
+            .filter(fs => fs.querySelector("input[type='radio'][required]") || fs.getAttribute("aria-required") === "true")
+            .filter(fs => !fs.querySelector("input[type='radio']:checked"));
+        return empty.concat(radios);
+    };
+    const flagErrors = els => els.forEach(el => {
+        const c = el.closest("[data-test-form-element]") || el;
+        if (c.querySelector(".artdeco-inline-feedback--error")) return;
+        const d = document.createElement("div");
+        d.className = "artdeco-inline-feedback artdeco-inline-feedback--error";
+        d.setAttribute("role", "alert");
+        d.textContent = "Please enter a valid answer";
+        c.appendChild(d);
+    });
+    document.addEventListener("click", e => {
+        const link = e.target.closest("a.job-card-container__link");
+        if (link) {
+            e.preventDefault();
+            document.getElementById("details").hidden = false;
+            mark("card", -1);
+            return;
+        }
+        const b = e.target.closest("button");
+        if (!b) return;
+        const label = b.getAttribute("aria-label") || "";
+        if (b.classList.contains("jobs-apply-button")) {
+            render(0);
+        } else if (label === "Dismiss") {
+            close("dismiss");
+        } else if (label === "Submit application") {
+            const bad = missing();
+            if (bad.length) { flagErrors(bad); mark("blocked", step); return; }
+            mark("submit", step);
+            if (SUBMIT_DELAY_MS) {
+                modalRoot.innerHTML = "";
+                setTimeout(() => { modalRoot.innerHTML = DONE; }, SUBMIT_DELAY_MS);
+            } else {
+                modalRoot.innerHTML = DONE;
+            }
+        } else if (b.hasAttribute("data-easy-apply-next-button") || label === "Review your application"
+                   || /continue/i.test(b.textContent)) {
+            const bad = missing();
+            if (bad.length) { flagErrors(bad); mark("blocked", step); return; }
+            if (step + 1 < STEPS.length) render(step + 1);
+        } else if (b.textContent.trim() === "Done") {
+            close("done");
+        }
+    }, true);
+})();
+"""
+
+def load_fixture(name):
+    fixture_dir = os.path.join(FIXTURES_DIR, name)
+    step_files = sorted(
+        (f for f in os.listdir(fixture_dir) if re.fullmatch(r"step\d+\.html", f)),
+        key=lambda f: int(re.findall(r"\d+", f)[0])
+    )
+    steps = []
+    for f in step_files:
+        with open(os.path.join(fixture_dir, f), "r") as fh:
+            steps.append(fh.read())
+    meta = {}
+    meta_path = os.path.join(fixture_dir, "meta.json")
+    if os.path.exists(meta_path):
+        with open(meta_path, "r") as fh:
+            meta = json.load(fh)
+    m = bot.JOB_ID_PATTERN.search(meta.get("url", ""))
+    return {
+        "name": name,
+        "dir": fixture_dir,
+        "steps": steps,
+        "title": meta.get("title", name),
+        "job_id": m.group(1) if m else "0",
+        "submit_delay_ms": int(meta.get("submit_delay_ms", 0))
+    }
+
+def render_page(fixture):
+    # Keep "</script>" inside recorded markup from closing the inline script.
+    steps_json = json.dumps(fixture["steps"]).replace("</", "<\\/")
+    title = fixture["title"].replace("<", "&lt;")
+    return (PAGE_TEMPLATE
+            .replace("__TITLE__", title)
+            .replace("__JOB_ID__", fixture["job_id"])
+            .replace("__SUBMIT_DELAY__", str(fixture["submit_delay_ms"]))
+            .replace("__SHIM__", REPLAY_SHIM)
+            .replace("__STEPS__", steps_json))
+
+def start_fixture_server(fixtures):
+    pages = {f"/{f['name']}/": render_page(f).encode("utf-8") for f in fixtures}
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            body = pages.get(self.path)
+            if body is None:
+                self.send_error(404)
+                return
+            self.send_response(200)
+            self.send_header("Content-Type", "text/html; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_port}"
+
+#################################
+# 2) INSTRUMENTED DRIVER
+#################################
+class CommandBudgetExceeded(RuntimeError):
+    pass
+
+class CommandCounter:
+    # Wraps driver.execute, the single choke point every WebDriver command
+    # (including WebElement methods) goes through.
+    def __init__(self, drv, budget=COMMAND_BUDGET):
+        self.count = 0
+        self.stamps = []
+        self.budget = budget
+        self.paused = False
+        inner = drv.execute
+
+        def execute(driver_command, params=None):
+            if not self.paused:
+                self.count += 1
+                self.stamps.append(time.time())
+                if self.count > self.budget:
+                    raise CommandBudgetExceeded(f"more than {self.budget} WebDriver commands")
+            return inner(driver_command, params)
+
+        drv.execute = execute
+
+    def reset(self):
+        self.count = 0
+        self.stamps = []
+
+    @contextlib.contextmanager
+    def uncounted(self):
+        self.paused = True
+        try:
+            yield
+        finally:
+            self.paused = False
+
+class VirtualSleep:
+    # Replaces the bot's time module: sleeps are added up instead of waited,
+    # so wall time measures the bot and the browser, not its pacing.
+    def __init__(self):
+        self.slept = 0.0
+
+    def sleep(self, seconds):
+        self.slept += seconds
+
+    def __getattr__(self, name):
+        return getattr(time, name)
+
+class OfflineTelegram:
+    # Accepts the broker's batched prompts without a network.
+    poll_timeout = 0
+
+    def __init__(self):
+        self.sent = []
+
+    def send_message(self, msg, options=None):
+        self.sent.append(msg)
+        return {"message_id": len(self.sent)}
+
+    def is_own_chat(self, msg):
+        return True
+
+    def get_updates(self, timeout=None):
+        return []
+
+def create_replay_driver(chrome_binary=None, chromedriver=None):
+    opts = webdriver.ChromeOptions()
+    if chrome_binary:
+        opts.binary_location = chrome_binary
+    for arg in ("--headless=new", "--no-sandbox", "--disable-dev-shm-usage", "--window-size=1280,900"):
+        opts.add_argument(arg)
+    service = Service(chromedriver) if chromedriver else Service()
+    return webdriver.Chrome(service=service, options=opts)
+
+#################################
+# 3) REPLAY & REPORT
+#################################
+def replay_fixture(drv, counter, base_url, fixture, verbose=False):
+    workdir = tempfile.mkdtemp(prefix="lnkd-replay-")
+    seed = os.path.join(fixture["dir"], "answers.json")
+    legacy = os.path.join(workdir, "answer_bank.json")
+    if os.path.exists(seed):
+        shutil.copy(seed, legacy)
+    sink = sys.stdout if verbose else io.StringIO()
+    sleeper = VirtualSleep()
+    with contextlib.redirect_stdout(sink):
+        bot.answer_bank.bind(bot.AnswerBank(os.path.join(workdir, "answer_bank.jsonl"), legacy_filepath=legacy))
+    bot.question_broker = bot.QuestionBroker(OfflineTelegram(), enabled=True)
+    bot.job_ledger.bind(bot.JobLedger(os.path.join(workdir, "job_ledger.jsonl")))
+    bot.checkpoint.bind(bot.Checkpoint(os.path.join(workdir, "checkpoint.json")))
+    bot.form_plans.bind(bot.FormPlanCache(os.path.join(workdir, "form_plans.jsonl")))
+    bot.llm_backend.bind(bot.StubAnswerBackend(os.path.join(fixture["dir"], "llm_stub.json")))
+    bot.time = sleeper
+
+    with counter.uncounted():
+        drv.get(f"{base_url}/{fixture['name']}/")
+    counter.reset()
+    outcome = None
+    t0 = time.time()
+    try:
+        with contextlib.redirect_stdout(sink):
+            bot.process_job_cards()
+    except CommandBudgetExceeded:
+        outcome = "stuck"
+    t1 = time.time()
+    with counter.uncounted():
+        events = drv.execute_script("return window.__replayLog || [];")
+    entry = bot.job_ledger.get(fixture["job_id"])
+    shutil.rmtree(workdir, ignore_errors=True)
+
+    kinds = {e["event"] for e in events}
+    if outcome is None and entry:
+        outcome = entry["outcome"]
+    if outcome is None:
+        outcome = "submitted" if "done" in kinds else "parked" if "dismiss" in kinds else "incomplete"
+
+    # Step i runs from its "step" event to the next one; "open" is everything
+    # before the first step (card click, Easy Apply button).
+    bounds = [("open", t0)] + [(f"step{e['step'] + 1}", e["t"] / 1000.0) for e in events if e["event"] == "step"]
+    steps = []
+    for i, (label, start) in enumerate(bounds):
+        end = bounds[i + 1][1] if i + 1 < len(bounds) else t1
+        commands = sum(1 for s in counter.stamps if start <= s < end)
+        steps.append({"step": label, "wall_ms": round((end - start) * 1000, 1), "commands": commands})
+
+    stats = bot.answer_bank.stats
+    lookups = sum(stats.values())
+    return {
+        "outcome": outcome,
+        "commands": counter.count,
+        "wall_s": round(t1 - t0, 3),
+        "virtual_sleep_s": round(sleeper.slept, 1),
+        "cache": dict(stats),
+        "cache_hit_rate": round((lookups - stats["miss"]) / lookups, 3) if lookups else None,
+        "steps": steps
+    }
+
+def git_commit():
+    try:
+        r = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=REPO_DIR,
+                           stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True)
+        return r.stdout.strip() or None
+    except OSError:
+        return None
+
+def last_history_entry():
+    if not os.path.exists(HISTORY_PATH):
+        return None
+    last = None
+    with open(HISTORY_PATH, "r") as f:
+        for line in f:
+            if line.strip():
+                try:
+                    last = json.loads(line)
+                except ValueError:
+                    pass
+    return last
+
+def print_report(results, previous):
+    prev = (previous or {}).get("results", {})
+    print(f"{'fixture':<24}{'outcome':<11}{'cmds':>6}{'Δcmds':>7}{'wall s':>8}{'sleep s':>9}{'hit rate':>10}")
+    for name, r in results.items():
+        before = prev.get(name, {}).get("commands")
+        delta = f"{r['commands'] - before:+d}" if before is not None else "-"
+        rate = "-" if r["cache_hit_rate"] is None else f"{r['cache_hit_rate']:.0%}"
+        print(f"{name:<24}{r['outcome']:<11}{r['commands']:>6}{delta:>7}{r['wall_s']:>8.2f}{r['virtual_sleep_s']:>9.1f}{rate:>10}")
+        for s in r["steps"]:
+            print(f"    {s['step']:<10}{s['commands']:>6} cmds {s['wall_ms']:>9.1f} ms")
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay Easy Apply fixtures offline and benchmark the form engine.")
+    parser.add_argument("--fixture", action="append", help="fixture name (repeatable); default: all")
+    parser.add_argument("--chrome-binary", default=os.getenv("CHROME_BINARY"))
+    parser.add_argument("--chromedriver", default=os.getenv("CHROMEDRIVER"))
+    parser.add_argument("--no-history", action="store_true", help="do not append this run to bench/history.jsonl")
+    parser.add_argument("--verbose", action="store_true", help="show the bot's own log output")
+    parser.add_argument("--profile", action="store_true", help="print a WebDriver call-site profile per fixture")
+    args = parser.parse_args()
+
+    bot.LOG_FILE = ""
+    bot.PROFILE_WEBDRIVER = args.profile
+    names = args.fixture or sorted(d for d in os.listdir(FIXTURES_DIR) if os.path.isdir(os.path.join(FIXTURES_DIR, d)))
+    fixtures = [load_fixture(n) for n in names]
+    server, base_url = start_fixture_server(fixtures)
+    drv = create_replay_driver(args.chrome_binary, args.chromedriver)
+    try:
+        counter = CommandCounter(drv)
+        bot.use_driver(drv)
+        results = {}
+        profiles = {}
+        for f in fixtures:
+            bot.webdriver_profiler.reset()
+            results[f["name"]] = replay_fixture(drv, counter, base_url, f, args.verbose)
+            profiles[f["name"]] = bot.webdriver_profiler.report()
+        browser_version = drv.capabilities.get("browserVersion")
+    finally:
+        drv.quit()
+        server.shutdown()
+
+    print_report(results, last_history_entry())
+    if args.profile:
+        for name, report in profiles.items():
+            print(f"\n=== {name} ===\n{report}")
+        print("\n" + bot.locators.report())
+    if not args.no_history:
+        entry = {
+            "ts": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "commit": git_commit(),
+            "browser": browser_version,
+            "results": results
+        }
+        with open(HISTORY_PATH, "a") as f:
+            f.write(json.dumps(entry) + "\n")
+
+if __name__ == "__main__":
+    main()
@@ -1,78 +1,905 @@
 import os
+import sys
 import time
 import random
 import subprocess
+import threading
 import json
+import re
+import math
+import hashlib
 import requests
 import openai
 import undetected_chromedriver as uc
 import platform
+import itertools
+import contextlib
+import logging
+import logging.handlers
+import atexit
+import shutil
+from collections import deque
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
 
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlencode, urlsplit, urlunsplit, parse_qsl, quote
 from selenium import webdriver
-from selenium.webdriver.common.by import By
-from selenium.webdriver.chrome.service import Service
 from selenium.webdriver.chrome.options import Options
+from selenium.webdriver.remote.command import Command
 from selenium_stealth import stealth
-from webdriver_manager.chrome import ChromeDriverManager
-from fake_useragent import UserAgent
-from selenium.webdriver.support.ui import WebDriverWait, Select
+from selenium.webdriver.support.ui import Select
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.common.exceptions import (
     TimeoutException,
-    NoSuchElementException,
     ElementClickInterceptedException,
-    ElementNotInteractableException
+    ElementNotInteractableException,
+    StaleElementReferenceException,
+    InvalidSessionIdException,
+    WebDriverException
 )
+from urllib3.exceptions import HTTPError as DriverConnectionError
+
+# Loaded before anything else so every section below sees the .env settings.
+from dotenv import load_dotenv
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+ENV_PATH = os.path.join(SCRIPT_DIR, ".env")
+load_dotenv(dotenv_path=ENV_PATH)
 
 #################################
-# 0) ANSWER BANK CLASS
+# 0) LOGGING, TRACING & METRICS
 #################################
-class AnswerBank:
-    def __init__(self, filepath="answer_bank.json"):
+LOG_LEVELS = {"DEBUG": 10, "INFO": 20, "WARN": 30, "ERROR": 40}
+LOG_LEVEL = os.getenv("LOG_LEVEL", "DEBUG").upper()
+LOG_FILE = os.getenv("LOG_FILE", "lnkdbot.jsonl")  # empty => no JSONL event log
+LOG_FILE_MAX_BYTES = 10 * 1024 * 1024
+LOG_FILE_BACKUPS = 5
+METRICS_PORT = int(os.getenv("METRICS_PORT", "9464"))  # 0 => no /metrics endpoint
+
+_event_logger = logging.getLogger("lnkdbot.events")
+_event_logger.propagate = False
+_event_logger.setLevel(logging.DEBUG)
+
+def _emit(record):
+    if not LOG_FILE:
+        return
+    if not _event_logger.handlers:
+        handler = logging.handlers.RotatingFileHandler(
+            LOG_FILE, maxBytes=LOG_FILE_MAX_BYTES, backupCount=LOG_FILE_BACKUPS, encoding="utf-8"
+        )
+        handler.setFormatter(logging.Formatter("%(message)s"))
+        _event_logger.addHandler(handler)
+    _event_logger.info(json.dumps(record, default=str, ensure_ascii=False))
+
+def log(level, *parts, **fields):
+    if LOG_LEVELS[level] < LOG_LEVELS.get(LOG_LEVEL, 10):
+        return
+    msg = " ".join(str(p) for p in parts)
+    print(f"[{level}] {msg}")
+    sp = current_span()
+    record = {"ts": round(time.time(), 3), "type": "log", "level": level, "msg": msg}
+    if sp is not None:
+        record["span"] = sp.id
+        record["phase"] = sp.name
+    if fields:
+        record.update(fields)
+    _emit(record)
+
+class Metrics:
+    # Minimal Prometheus-style registry: labelled counters, gauges and
+    # histograms, rendered in the text exposition format by render().
+    BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 900, 3600, 36000)
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.counters = {}
+        self.gauges = {}
+        self.histograms = {}
+        self.started = time.time()
+
+    @staticmethod
+    def _key(name, labels):
+        return name, tuple(sorted(labels.items()))
+
+    def inc(self, name, value=1, **labels):
+        key = self._key(name, labels)
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def set(self, name, value, **labels):
+        with self._lock:
+            self.gauges[self._key(name, labels)] = value
+
+    def observe(self, name, value, **labels):
+        key = self._key(name, labels)
+        with self._lock:
+            h = self.histograms.get(key)
+            if h is None:
+                h = self.histograms[key] = {"buckets": [0] * len(self.BUCKETS), "sum": 0.0, "count": 0}
+            for i, bound in enumerate(self.BUCKETS):
+                if value <= bound:
+                    h["buckets"][i] += 1
+            h["sum"] += value
+            h["count"] += 1
+
+    def counter_total(self, name, **match):
+        with self._lock:
+            return sum(v for (n, labels), v in self.counters.items()
+                       if n == name and all(dict(labels).get(k) == want for k, want in match.items()))
+
+    @staticmethod
+    def _labels(labels, extra=()):
+        items = list(labels) + list(extra)
+        if not items:
+            return ""
+        return "{" + ",".join(f'{k}="{str(v).replace(chr(34), chr(39))}"' for k, v in items) + "}"
+
+    def _derived(self):
+        hits = self.counter_total("answer_lookups_total", result="exact") + self.counter_total("answer_lookups_total", result="fuzzy")
+        lookups = self.counter_total("answer_lookups_total")
+        hours = max((time.time() - self.started) / 3600, 1e-9)
+        self.set("answer_cache_hit_ratio", hits / lookups if lookups else 0.0)
+        self.set("applications_per_hour", self.counter_total("applications_total", outcome="submitted") / hours)
+        self.set("uptime_seconds", time.time() - self.started)
+
+    def render(self):
+        self._derived()
+        lines = []
+        with self._lock:
+            for kind, table in (("counter", self.counters), ("gauge", self.gauges)):
+                seen = set()
+                for (name, labels), value in sorted(table.items()):
+                    metric = f"lnkdbot_{name}"
+                    if name not in seen:
+                        lines.append(f"# TYPE {metric} {kind}")
+                        seen.add(name)
+                    lines.append(f"{metric}{self._labels(labels)} {value}")
+            seen = set()
+            for (name, labels), h in sorted(self.histograms.items()):
+                metric = f"lnkdbot_{name}"
+                if name not in seen:
+                    lines.append(f"# TYPE {metric} histogram")
+                    seen.add(name)
+                for bound, count in zip(self.BUCKETS, h["buckets"]):
+                    lines.append(f"{metric}_bucket{self._labels(labels, [('le', bound)])} {count}")
+                lines.append(f"{metric}_bucket{self._labels(labels, [('le', '+Inf')])} {h['count']}")
+                lines.append(f"{metric}_sum{self._labels(labels)} {h['sum']}")
+                lines.append(f"{metric}_count{self._labels(labels)} {h['count']}")
+        return "\n".join(lines) + "\n"
+
+metrics = Metrics()
+
+def start_metrics_server(port=METRICS_PORT):
+    if not port:
+        return None
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?")[0] != "/metrics":
+                self.send_error(404)
+                return
+            body = metrics.render().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    try:
+        server = ThreadingHTTPServer(("127.0.0.1", port), MetricsHandler)
+    except OSError as e:
+        log("WARN", f"Metrics endpoint disabled (port {port}) =>", e)
+        return None
+    threading.Thread(target=server.serve_forever, name="metrics", daemon=True).start()
+    log("INFO", f"Metrics at http://127.0.0.1:{port}/metrics")
+    return server
+
+class Span:
+    def __init__(self, name, attrs, parent):
+        self.id = next(_span_ids)
+        self.name = name
+        self.attrs = attrs
+        self.parent = parent
+        self.counts = {}
+
+_span_ids = itertools.count(1)
+_span_state = threading.local()
+
+def _span_stack():
+    stack = getattr(_span_state, "stack", None)
+    if stack is None:
+        stack = _span_state.stack = []
+    return stack
+
+def current_span():
+    stack = _span_stack()
+    return stack[-1] if stack else None
+
+def count_in_spans(name, value=1):
+    # Counts are inclusive: a WebDriver command made while filling a field is
+    # also counted on its form step, application, card and search page.
+    for sp in _span_stack():
+        sp.counts[name] = sp.counts.get(name, 0) + value
+
+@contextlib.contextmanager
+def span(name, **attrs):
+    # Nested timing span (search_page > card > application > form_step > field).
+    # On exit its duration feeds the phase_duration_seconds histogram and a
+    # span record with its counters goes to the JSONL event log.
+    stack = _span_stack()
+    sp = Span(name, attrs, stack[-1].id if stack else None)
+    stack.append(sp)
+    t0 = time.perf_counter()
+    status = "ok"
+    try:
+        yield sp
+    except BaseException:
+        status = "error"
+        raise
+    finally:
+        dur = time.perf_counter() - t0
+        stack.pop()
+        metrics.observe("phase_duration_seconds", dur, phase=name)
+        _emit({
+            "ts": round(time.time(), 3),
+            "type": "span",
+            "name": name,
+            "span": sp.id,
+            "parent": sp.parent,
+            "dur_ms": round(dur * 1000, 1),
+            "status": status,
+            "attrs": attrs,
+            "counts": sp.counts
+        })
+
+# Opt-in WebDriver profiler: every command is charged to the line of this
+# file that issued it, with its round-trip time and payload size. The report
+# ranks call sites for the whole run and for each form step, and a folded
+# stack file ("a;b;c <microseconds>") can be fed to flamegraph.pl or
+# speedscope as is.
+PROFILE_WEBDRIVER = os.getenv("PROFILE_WEBDRIVER", "0") == "1"
+PROFILE_REPORT_PREFIX = os.getenv("PROFILE_REPORT_PREFIX", "webdriver_profile")
+PROFILE_TOP = int(os.getenv("PROFILE_TOP", "20"))
+
+class WebDriverProfiler:
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.sites = {}   # (site, command) -> [calls, seconds, bytes]
+        self.steps = {}   # step label -> same, per step
+        self.stacks = {}  # folded bot stack -> seconds
+        self.step = None  # set by ApplicationFlow: "<job id> open" / "<job id> step N"
+
+    @staticmethod
+    def _call_stack(frame):
+        # Frames of this file only, outermost first; Selenium's own frames
+        # and the instrumentation wrapper are skipped.
+        names, site = [], None
+        while frame is not None:
+            code = frame.f_code
+            if code.co_filename == __file__:
+                name = getattr(code, "co_qualname", code.co_name)
+                if site is None:
+                    site = f"{name}:{frame.f_lineno}"
+                names.append(name)
+            frame = frame.f_back
+        names.reverse()
+        return site or "(outside the bot)", ";".join(names)
+
+    @staticmethod
+    def _add(table, key, seconds, nbytes):
+        row = table.setdefault(key, [0, 0.0, 0])
+        row[0] += 1
+        row[1] += seconds
+        row[2] += nbytes
+
+    def record(self, frame, command, params, response, seconds):
+        site, stack = self._call_stack(frame)
+        nbytes = len(json.dumps(params, default=str)) if params else 0
+        if isinstance(response, dict):
+            nbytes += len(json.dumps(response.get("value"), default=str))
+        self._add(self.sites, (site, command), seconds, nbytes)
+        if self.step:
+            self._add(self.steps.setdefault(self.step, {}), (site, command), seconds, nbytes)
+        folded = f"{stack};{command}" if stack else command
+        self.stacks[folded] = self.stacks.get(folded, 0.0) + seconds
+
+    @staticmethod
+    def _table(rows, top):
+        total = sum(r[1] for r in rows.values()) or 1e-9
+        lines = [f"  {'ms':>9} {'%':>5} {'calls':>6} {'KiB':>7}  call site / command"]
+        for (site, command), (calls, secs, nbytes) in sorted(rows.items(), key=lambda kv: -kv[1][1])[:top]:
+            lines.append(f"  {secs * 1000:>9.1f} {secs / total:>5.0%} {calls:>6} {nbytes / 1024:>7.1f}  {site} {command}")
+        return lines
+
+    def report(self, top=PROFILE_TOP):
+        calls = sum(r[0] for r in self.sites.values())
+        secs = sum(r[1] for r in self.sites.values())
+        lines = [f"WebDriver profile: {calls} commands, {secs * 1000:.0f} ms in round trips", "", "Run:"]
+        lines += self._table(self.sites, top)
+        for label, rows in self.steps.items():
+            step_secs = sum(r[1] for r in rows.values())
+            lines += ["", f"Job {label} ({sum(r[0] for r in rows.values())} commands, {step_secs * 1000:.0f} ms):"]
+            lines += self._table(rows, max(5, top // 4))
+        return "\n".join(lines)
+
+    def write(self, prefix=PROFILE_REPORT_PREFIX):
+        if not self.sites:
+            return
+        try:
+            with open(prefix + ".txt", "w", encoding="utf-8") as f:
+                f.write(self.report() + "\n")
+                if locators.ready:
+                    f.write("\n" + locators.report() + "\n")
+            with open(prefix + ".folded", "w", encoding="utf-8") as f:
+                for stack, secs in sorted(self.stacks.items()):
+                    f.write(f"{stack} {round(secs * 1e6)}\n")
+        except OSError as e:
+            log("WARN", "Could not write WebDriver profile =>", e)
+            return
+        log("INFO", f"WebDriver profile written to {prefix}.txt / {prefix}.folded")
+
+webdriver_profiler = WebDriverProfiler()
+if PROFILE_WEBDRIVER:
+    atexit.register(webdriver_profiler.write)
+
+def pause(seconds, reason="pace"):
+    # Every deliberate sleep goes through here so the time spent waiting on
+    # purpose shows up per phase instead of hiding inside other spans.
+    metrics.inc("sleep_seconds_total", seconds, reason=reason)
+    count_in_spans("sleep_s", round(seconds, 3))
+    time.sleep(seconds)
+
+class Lazy:
+    # Stand-in for a module-level singleton that is only built on first
+    # attribute access, so importing the bot stays cheap. bind() swaps in a
+    # ready-made instance (tools, tests, recycled drivers); reset() drops it.
+    def __init__(self, factory):
+        self._factory = factory
+        self._instance = None
+
+    def resolve(self):
+        if self._instance is None:
+            self._instance = self._factory()
+        return self._instance
+
+    def bind(self, instance):
+        self._instance = instance
+        return instance
+
+    def reset(self):
+        self._instance = None
+
+    @property
+    def ready(self):
+        return self._instance is not None
+
+    def __getattr__(self, name):
+        return getattr(self.resolve(), name)
+
+#################################
+# 0b) ANSWER BANK CLASS
+#################################
+class JsonlStore:
+    # Append-only key/value log: one JSON record per line, last write wins.
+    # A write costs one appended line no matter how big the store is, and a
+    # torn trailing line from a crash is ignored on the next load. The log is
+    # compacted (atomic tmp file + os.replace) once it carries too many stale
+    # records.
+    #
+    # Other writers (a hand edit, a script, a second bot) are picked up by
+    # refresh(): a stat() decides whether anything changed; a pure append is
+    # merged by reading only the new bytes, anything else (rewrite, rename,
+    # truncation) by a full reload. Writes and compaction hold a file lock and
+    # merge pending changes first, so nobody's records are dropped.
+    # on_change(changed_keys, removed_keys) is called for merged changes.
+    TAIL_SIG = 32  # bytes before the read offset that must be unchanged for an incremental read
+
+    def __init__(self, filepath, compact_ratio=2.0, compact_min=500, on_change=None):
         self.filepath = filepath
+        self.compact_ratio = compact_ratio
+        self.compact_min = compact_min
+        self.on_change = on_change
         self.data = {}
-        if os.path.exists(self.filepath):
+        self._lines = 0
+        self._torn_tail = False
+        self._offset = 0
+        self._tail = b""
+        self._stat = None
+        self._load()
+
+    def _stat_file(self):
+        try:
+            st = os.stat(self.filepath)
+        except FileNotFoundError:
+            return None
+        return (st.st_ino, st.st_size, st.st_mtime_ns)
+
+    def _load(self):
+        # Full (re)read; self.data is cleared in place because callers keep a
+        # reference to it. Returns the previous contents.
+        old = dict(self.data)
+        self.data.clear()
+        self._lines = 0
+        self._offset = 0
+        self._tail = b""
+        self._torn_tail = False
+        self._stat = self._stat_file()
+        if self._stat is not None:
+            with open(self.filepath, "rb") as f:
+                self._consume(f)
+        return old
+
+    def _consume(self, f):
+        # Applies complete lines from the current position on and advances
+        # the read offset past them; a partial last line is left for later.
+        keys = []
+        for raw in f:
+            if not raw.endswith(b"\n"):
+                if not self._torn_tail:
+                    log("WARN", "Ignoring torn trailing record in", self.filepath)
+                self._torn_tail = True
+                break
+            self._torn_tail = False
+            self._offset += len(raw)
+            self._tail = (self._tail + raw)[-self.TAIL_SIG:]
+            rec = self._parse(raw)
+            if rec is not None:
+                self._apply(rec)
+                self._lines += 1
+                keys.append(rec["k"])
+        return keys
+
+    def refresh(self, level="INFO"):
+        st = self._stat_file()
+        if st == self._stat:
+            return False
+        changed, removed = set(), set()
+        appended = (st is not None and self._stat is not None and st[0] == self._stat[0]
+                    and st[1] > self._offset)
+        if appended:
+            with open(self.filepath, "rb") as f:
+                f.seek(self._offset - len(self._tail))
+                if f.read(len(self._tail)) == self._tail:
+                    self._stat = st
+                    changed = set(self._consume(f))
+                else:
+                    appended = False
+        if not appended:
+            old = self._load()
+            missing = object()
+            changed = {k for k, v in self.data.items() if old.get(k, missing) != v}
+            removed = set(old) - set(self.data)
+        if changed or removed:
+            log(level, f"Merged external changes to {self.filepath}: {len(changed)} changed, {len(removed)} removed.")
+            if self.on_change:
+                self.on_change(changed, removed)
+        return bool(changed or removed)
+
+    @contextlib.contextmanager
+    def _locked(self):
+        # Cross-process writer lock on a sidecar file: flock where available,
+        # otherwise an exclusive-create lock file (broken after 10 s).
+        path = self.filepath + ".lock"
+        if fcntl is not None:
+            with open(path, "a") as lf:
+                fcntl.flock(lf, fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    fcntl.flock(lf, fcntl.LOCK_UN)
+            return
+        deadline = time.time() + 10
+        while True:
             try:
-                with open(self.filepath, "r") as f:
-                    self.data = json.load(f)
-            except json.JSONDecodeError:
-                self.data = {}
+                fd = os.open(path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+                break
+            except FileExistsError:
+                if time.time() > deadline:
+                    log("WARN", "Breaking stale lock", path)
+                    with contextlib.suppress(OSError):
+                        os.remove(path)
+                    deadline = time.time() + 10
+                time.sleep(0.05)
+        try:
+            yield
+        finally:
+            os.close(fd)
+            with contextlib.suppress(OSError):
+                os.remove(path)
+
+    @staticmethod
+    def _parse(raw):
+        try:
+            rec = json.loads(raw)
+        except ValueError:
+            return None
+        if not isinstance(rec, dict) or "k" not in rec:
+            return None
+        return rec
+
+    def _apply(self, rec):
+        self.data[rec["k"]] = rec.get("v")
+
+    @staticmethod
+    def _encode(key, value):
+        return (json.dumps({"k": key, "v": value}, ensure_ascii=False) + "\n").encode("utf-8")
+
+    def get(self, key, default=None):
+        return self.data.get(key, default)
+
+    def put(self, key, value):
+        with self._locked():
+            self.refresh("DEBUG")
+            self._append(self._encode(key, value))
+        self.data[key] = value
+        self._lines += 1
+        if self._lines > self.compact_min and self._lines > self.compact_ratio * len(self.data):
+            self.compact()
+
+    def _append(self, payload):
+        if self._torn_tail:
+            payload = b"\n" + payload
+        fd = os.open(self.filepath, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        try:
+            before = os.fstat(fd)
+            os.write(fd, payload)
+            os.fsync(fd)
+            after = os.fstat(fd)
+        finally:
+            os.close(fd)
+        self._torn_tail = False
+        if self._stat is None and before.st_size == 0:
+            self._stat = (before.st_ino, 0, 0)
+        if self._stat is not None and (before.st_ino, before.st_size) == (self._stat[0], self._stat[1]):
+            self._offset = after.st_size
+            self._tail = (self._tail + payload)[-self.TAIL_SIG:]
+            self._stat = (after.st_ino, after.st_size, after.st_mtime_ns)
+        else:
+            # Someone slipped a change in without the lock (e.g. an editor
+            # save); the next refresh re-reads the whole file.
+            self._stat = None
+
+    def compact(self):
+        with self._locked():
+            self.refresh("DEBUG")
+            tmp = self.filepath + ".tmp"
+            with open(tmp, "wb") as f:
+                for k, v in self.data.items():
+                    f.write(self._encode(k, v))
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp, self.filepath)
+            self._lines = len(self.data)
+            self._torn_tail = False
+            self._stat = self._stat_file()
+            self._offset = self._stat[1] if self._stat else 0
+            self._tail = b""
+            if self._stat and self._offset:
+                with open(self.filepath, "rb") as f:
+                    f.seek(max(0, self._offset - self.TAIL_SIG))
+                    self._tail = f.read()
+        log("INFO", f"Compacted {self.filepath} => {self._lines} records.")
+
+QUESTION_STOPWORDS = frozenset("""
+a an the of to in on at for with by from as and or is are was were be been being
+do does did have has had having you your yours we our us i me my it its this that
+these those what which who whom how many much please any if will would can could
+should shall may might there here about into than then so such
+""".split())
+FUZZY_MATCH_THRESHOLD = 0.75
+
+def normalize_question(text):
+    tokens = []
+    for tok in re.findall(r"[a-z0-9+#]+", text.lower()):
+        if tok in QUESTION_STOPWORDS:
+            continue
+        if len(tok) > 3 and tok.endswith("s") and not tok.endswith("ss"):
+            tok = tok[:-1]
+        tokens.append(tok)
+    return frozenset(tokens)
+
+class FuzzyQuestionIndex:
+    # Inverted token index over normalized questions, scored by Jaccard
+    # similarity. Candidates come only from the postings of the query's rarest
+    # tokens (prefix filtering), so a lookup touches a handful of entries even
+    # when the bank holds tens of thousands.
+    def __init__(self):
+        self._entries = {}
+        self._postings = {}
+
+    def add(self, key, question_text, question_type):
+        self.remove(key)
+        tokens = normalize_question(question_text)
+        if not tokens:
+            return
+        self._entries[key] = (question_type, tokens)
+        for tok in tokens:
+            self._postings.setdefault((question_type, tok), set()).add(key)
+
+    def remove(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        qtype, tokens = entry
+        for tok in tokens:
+            bucket = self._postings.get((qtype, tok))
+            if bucket is not None:
+                bucket.discard(key)
+                if not bucket:
+                    del self._postings[(qtype, tok)]
+
+    def search(self, question_text, question_type, threshold=FUZZY_MATCH_THRESHOLD):
+        tokens = normalize_question(question_text)
+        if not tokens:
+            return []
+        n = len(tokens)
+        prefix_len = n - math.ceil(threshold * n) + 1
+        ranked = sorted(tokens, key=lambda t: len(self._postings.get((question_type, t), ())))
+        candidates = set()
+        for tok in ranked[:prefix_len]:
+            candidates |= self._postings.get((question_type, tok), set())
+        lo, hi = threshold * n, n / threshold
+        entries = self._entries
+        hits = []
+        for key in candidates:
+            other = entries[key][1]
+            m = len(other)
+            if m < lo or m > hi:
+                continue
+            common = len(tokens & other)
+            score = common / (n + m - common)
+            if score >= threshold:
+                hits.append((score, key))
+        hits.sort(reverse=True)
+        return hits
+
+
+class AnswerBank:
+    # Human-confirmed answers live in the main store. Machine answers (the LLM
+    # tier) are memoized next to it with their confidence, in a separate log,
+    # so they never shadow what a human said.
+    def __init__(self, filepath="answer_bank.jsonl", legacy_filepath="answer_bank.json", memo_filepath=None):
+        self.filepath = filepath
+        self.fuzzy = FuzzyQuestionIndex()
+        self.store = JsonlStore(filepath, on_change=self._reindex)
+        self.data = self.store.data
+        self.memo = JsonlStore(memo_filepath or os.path.splitext(filepath)[0] + ".llm.jsonl")
+        if legacy_filepath and os.path.exists(legacy_filepath):
+            self._migrate_legacy(legacy_filepath)
+        self.stats = {"exact": 0, "fuzzy": 0, "rules": 0, "llm": 0, "miss": 0}
+        for key in self.data:
+            self._index_key(key)
+
+    def refresh(self):
+        # Cheap when nothing changed: one stat() per log.
+        self.store.refresh()
+        self.memo.refresh()
+
+    def _reindex(self, changed, removed):
+        for key in removed:
+            self.fuzzy.remove(key)
+        for key in changed:
+            self._index_key(key)
+
+    def _index_key(self, key):
+        question_type, sep, question_text = key.partition("::")
+        if sep:
+            self.fuzzy.add(key, question_text, question_type)
+
+    def _migrate_legacy(self, legacy_filepath):
+        # One-time import of the old whole-file JSON bank. Entries already in
+        # the log win; the legacy file is renamed so this never runs twice.
+        try:
+            with open(legacy_filepath, "r") as f:
+                legacy = json.load(f)
+        except (OSError, json.JSONDecodeError) as e:
+            log("ERROR", "Could not migrate legacy answer bank =>", e)
+            return
+        if not isinstance(legacy, dict):
+            log("ERROR", "Legacy answer bank is not a JSON object => skipping migration.")
+            return
+        merged = 0
+        for key, answer in legacy.items():
+            if key not in self.data:
+                self.data[key] = answer
+                merged += 1
+        self.store.compact()
+        os.replace(legacy_filepath, legacy_filepath + ".migrated")
+        log("INFO", f"Migrated {merged} answers from {legacy_filepath} => {self.filepath}")
 
     def _make_key(self, question_text, question_type):
         return f"{question_type.lower()}::{question_text.strip().lower()}"
 
     def get_answer(self, question_text, question_type):
         key = self._make_key(question_text, question_type)
-        return self.data.get(key)
+        return self.store.get(key)
 
     def add_answer(self, question_text, question_type, answer):
         key = self._make_key(question_text, question_type)
-        self.data[key] = answer
-        self._save()
-
-    def _save(self):
-        with open(self.filepath, "w") as f:
-            json.dump(self.data, f, indent=4)
-
-answer_bank = AnswerBank()
-
-def get_answer_cached(question_text, question_type, options=None):
-    existing = answer_bank.get_answer(question_text, question_type)
-    if existing:
-        print(f"[DEBUG] Using cached answer for '{question_type}' question: {question_text}")
-        return existing
-    ans = get_telegram_answer(question_text, options)
-    answer_bank.add_answer(question_text, question_type, ans)
-    return ans
+        self.store.put(key, answer)
+        self._index_key(key)
+
+    def get_memo(self, question_text, question_type):
+        return self.memo.get(self._make_key(question_text, question_type))
+
+    def memoize(self, question_text, question_type, answer, confidence, source):
+        self.memo.put(self._make_key(question_text, question_type), {
+            "answer": answer,
+            "confidence": round(confidence, 3),
+            "source": source,
+            "ts": time.strftime("%Y-%m-%dT%H:%M:%S")
+        })
+
+    def get_answer_fuzzy(self, question_text, question_type, options=None, threshold=FUZZY_MATCH_THRESHOLD):
+        # Near-duplicate lookup. For dropdown/radio questions the stored answer
+        # must still name one of the current options.
+        qtype = question_type.lower()
+        for score, key in self.fuzzy.search(question_text, qtype, threshold):
+            answer = self.data.get(key)
+            if not answer:
+                continue
+            if options is not None:
+                answer = match_option(options, answer)
+                if answer is None:
+                    continue
+            return answer, score, key
+        return None
+
+answer_bank = Lazy(AnswerBank)
+
+FORM_PLANS_FILE = os.getenv("FORM_PLANS_FILE", "form_plans.jsonl")
+FORM_PLAN_CACHE = os.getenv("FORM_PLAN_CACHE", "1") != "0"
+
+class FormPlanCache:
+    # Complete answer plans of form steps already filled once, keyed by the
+    # step's structure: field types and normalized questions, in order. The
+    # option lists are stored with the plan, and a step whose questions match
+    # but whose options differ drops the entry instead of replaying it. So
+    # does a plan that disagrees with an answer since corrected in the bank.
+    def __init__(self, filepath=FORM_PLANS_FILE):
+        self.store = JsonlStore(filepath)
+        self.stats = {"hit": 0, "miss": 0, "invalidated": 0}
+
+    @staticmethod
+    def fingerprint(fields):
+        shape = [[f["type"], " ".join(f["question"].lower().split())] for f in fields]
+        return hashlib.sha1(json.dumps(shape, ensure_ascii=False).encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def _options(fields):
+        return [f["options"] or [] for f in fields]
+
+    def _count(self, result):
+        self.stats[result] += 1
+        metrics.inc("form_plan_lookups_total", result=result)
+
+    def lookup(self, fingerprint, fields):
+        # Returns the stored plan entries ({"i", "key", "value", "choice"})
+        # or None.
+        answer_bank.refresh()
+        entry = self.store.get(fingerprint)
+        if entry is None:
+            self._count("miss")
+            return None
+        if entry["options"] != self._options(fields):
+            self.invalidate(fingerprint, "options changed")
+            return None
+        for item in entry["plan"]:
+            banked = answer_bank.store.get(item["key"])
+            if banked is not None and plan_entry(fields[item["i"]], item["key"], banked)["value"] != item["value"]:
+                self.invalidate(fingerprint, "answer changed")
+                return None
+        self._count("hit")
+        return entry["plan"]
+
+    def save(self, fingerprint, fields, plan):
+        index = {f["handle"]: i for i, f in enumerate(fields)}
+        items = []
+        for p in plan:
+            items.append({"i": index[p["handle"]], "key": p["key"], "value": p["value"], "choice": p["choice"]})
+        self.store.put(fingerprint, {"options": self._options(fields), "plan": items,
+                                     "ts": time.strftime("%Y-%m-%dT%H:%M:%S")})
+
+    def invalidate(self, fingerprint, reason):
+        if self.store.get(fingerprint) is None:
+            return
+        log("DEBUG", f"Form plan {fingerprint[:10]} invalidated ({reason}).")
+        self.store.put(fingerprint, None)
+        self._count("invalidated")
+
+form_plans = Lazy(FormPlanCache)
+
+class JobLedger:
+    # Outcome of every LinkedIn job id the bot has evaluated, kept across
+    # cycles and restarts so a posting costs at most one full evaluation.
+    # Final outcomes are never retried; a parked job is skipped while the
+    # question broker still holds it (after a restart it is parked again).
+    FINAL_OUTCOMES = ("submitted", "no-easy-apply", "stuck")
+
+    def __init__(self, filepath="job_ledger.jsonl"):
+        self.store = JsonlStore(filepath)
+
+    def get(self, job_id):
+        return self.store.get(str(job_id))
+
+    def record(self, job, outcome, reason=None):
+        prev = self.get(job["id"]) or {}
+        self.store.put(str(job["id"]), {
+            "outcome": outcome,
+            "reason": reason,
+            "ts": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "title": job.get("title"),
+            "attempts": prev.get("attempts", 0) + 1
+        })
+
+    def skip_reason(self, job_id):
+        entry = self.get(job_id)
+        if not entry:
+            return None
+        if entry["outcome"] in self.FINAL_OUTCOMES:
+            return entry["outcome"]
+        if entry["outcome"] == "parked" and question_broker.is_parked(job_id):
+            return "parked"
+        return None
+
+job_ledger = Lazy(JobLedger)
+
+CHECKPOINT_FILE = os.getenv("CHECKPOINT_FILE", "checkpoint.json")
+
+class Checkpoint:
+    # Where the current cycle is: the search in progress and its page, the
+    # job being applied to, its last form step and the answers already
+    # entered for it. Rewritten atomically (tmp + fsync + os.replace) at
+    # every boundary so a crash leaves either the old or the new state.
+    def __init__(self, filepath=CHECKPOINT_FILE):
+        self.filepath = filepath
+        self.state = {}
+        try:
+            with open(filepath, "r", encoding="utf-8") as f:
+                self.state = json.load(f)
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError) as e:
+            log("WARN", f"Ignoring unreadable checkpoint {filepath} =>", e)
+
+    def get(self, key, default=None):
+        return self.state.get(key, default)
+
+    def update(self, **fields):
+        self.state.update(fields)
+        self.state["updated"] = time.strftime("%Y-%m-%dT%H:%M:%S")
+        self._write()
+
+    def clear(self, *keys):
+        if not any(k in self.state for k in keys):
+            return
+        for key in keys:
+            self.state.pop(key, None)
+        self._write()
+
+    def _write(self):
+        tmp = self.filepath + ".tmp"
+        try:
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(self.state, f, ensure_ascii=False)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp, self.filepath)
+        except OSError as e:
+            log("WARN", "Could not write checkpoint =>", e)
+
+checkpoint = Lazy(Checkpoint)
 
 #################################
 # 1) ENV & TELEGRAM SETUP
 #################################
-from dotenv import load_dotenv
-SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
-ENV_PATH = os.path.join(SCRIPT_DIR, ".env")
-load_dotenv(dotenv_path=ENV_PATH)
-
 TELEGRAM_BOT_TOKEN = os.getenv("TELEGRAM_BOT_TOKEN")
 TELEGRAM_CHAT_ID = os.getenv("TELEGRAM_CHAT_ID")
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
@@ -81,561 +908,2372 @@ LINKEDIN_JSESSIONID = os.getenv("LINKEDIN_JSESSIONID")
 
 openai.api_key = OPENAI_API_KEY
 
-TELEGRAM_SEND_MESSAGE_URL = f"https://api.telegram.org/bot{TELEGRAM_BOT_TOKEN}/sendMessage"
-TELEGRAM_GET_UPDATES_URL = f"https://api.telegram.org/bot{TELEGRAM_BOT_TOKEN}/getUpdates"
+TELEGRAM_API_BASE = os.getenv("TELEGRAM_API_BASE", "https://api.telegram.org")
+TELEGRAM_LONG_POLL_TIMEOUT = 50  # seconds the Bot API may hold a getUpdates call open
+TELEGRAM_REPLY_TIMEOUT = int(os.getenv("TELEGRAM_REPLY_TIMEOUT", "36000"))  # 10 hours
 
-LAST_UPDATE_ID = 0
+class TelegramClient:
+    # Bot API client on one pooled requests.Session. Replies are read with
+    # server-side long polling, and the update offset is client state, so old
+    # updates are drained once per process instead of before every question.
+    # Point api_base at a local stand-in of the Bot API to exercise it offline.
+    def __init__(self, token, chat_id, api_base=TELEGRAM_API_BASE,
+                 poll_timeout=TELEGRAM_LONG_POLL_TIMEOUT, session=None):
+        self.base_url = f"{api_base.rstrip('/')}/bot{token}"
+        self.chat_id = str(chat_id)
+        self.poll_timeout = poll_timeout
+        self.session = session or requests.Session()
+        self.last_update_id = 0
+        self.drained = False
+        self.calls = 0
 
-def drain_old_updates():
-    global LAST_UPDATE_ID
-    while True:
+    def _call(self, method, http_timeout=30, **payload):
+        self.calls += 1
+        metrics.inc("telegram_calls_total", method=method)
+        count_in_spans("telegram_calls")
+        r = self.session.post(f"{self.base_url}/{method}", json=payload, timeout=http_timeout)
+        r.raise_for_status()
+        data = r.json()
+        if not data.get("ok"):
+            raise RuntimeError(f"Telegram {method} failed: {data.get('description')}")
+        return data.get("result")
+
+    def drain_old_updates(self):
+        # A negative offset confirms everything but the newest update in a
+        # single round trip; remembering its id skips that one as well.
         try:
-            resp = requests.get(TELEGRAM_GET_UPDATES_URL, params={"offset": LAST_UPDATE_ID + 1, "timeout": 2})
-            resp.raise_for_status()
-            data = resp.json()
-            results = data.get("result", [])
-            if not results:
-                break
-            for upd in results:
-                upd_id = upd["update_id"]
-                if upd_id > LAST_UPDATE_ID:
-                    LAST_UPDATE_ID = upd_id
+            results = self._call("getUpdates", offset=-1, timeout=0)
+            if results:
+                self.last_update_id = max(self.last_update_id, results[-1]["update_id"])
+            self.drained = True
         except Exception as e:
-            print("[ERROR] drain_old_updates =>", e)
-            break
-    print("[INFO] Drained old updates. LAST_UPDATE_ID =>", LAST_UPDATE_ID)
+            log("ERROR", "drain_old_updates =>", e)
+        log("INFO", "Drained old updates. last_update_id =>", self.last_update_id)
 
-def send_telegram_message(msg, options=None):
-    drain_old_updates()
-    data = {"chat_id": TELEGRAM_CHAT_ID, "text": msg}
-    if options:
-        kb = [[{"text": opt}] for opt in options]
-        data["reply_markup"] = json.dumps({
-            "keyboard": kb,
-            "one_time_keyboard": True,
-            "resize_keyboard": True
-        })
-    try:
-        r = requests.post(TELEGRAM_SEND_MESSAGE_URL, json=data)
-        r.raise_for_status()
-        print("[DEBUG] Sent Telegram:", msg)
-        return wait_for_telegram_reply()
-    except Exception as e:
-        print("[ERROR] send_telegram_message =>", e)
+    def get_updates(self, timeout=None):
+        timeout = self.poll_timeout if timeout is None else timeout
+        results = self._call(
+            "getUpdates",
+            http_timeout=timeout + 15,
+            offset=self.last_update_id + 1,
+            timeout=timeout,
+            allowed_updates=["message"]
+        ) or []
+        for upd in results:
+            if upd["update_id"] > self.last_update_id:
+                self.last_update_id = upd["update_id"]
+        return results
+
+    def is_own_chat(self, msg):
+        return str(msg.get("chat", {}).get("id")) == self.chat_id
+
+    def send_message(self, msg, options=None):
+        data = {"chat_id": self.chat_id, "text": msg}
+        if options:
+            kb = [[{"text": opt}] for opt in options]
+            data["reply_markup"] = {
+                "keyboard": kb,
+                "one_time_keyboard": True,
+                "resize_keyboard": True
+            }
+        return self._call("sendMessage", **data)
+
+    def wait_for_reply(self, timeout=TELEGRAM_REPLY_TIMEOUT):
+        deadline = time.time() + timeout
+        backoff = 2
+        while True:
+            remaining = deadline - time.time()
+            if remaining <= 0:
+                break
+            try:
+                for upd in self.get_updates(timeout=int(min(self.poll_timeout, max(remaining, 1)))):
+                    msg = upd.get("message", {})
+                    if self.is_own_chat(msg) and "text" in msg:
+                        reply = msg["text"]
+                        log("DEBUG", "Received Telegram reply:", reply)
+                        return reply
+                backoff = 2
+            except Exception as e:
+                log("ERROR", "wait_for_telegram_reply =>", e)
+                time.sleep(min(backoff, max(deadline - time.time(), 0)))
+                backoff = min(backoff * 2, 60)
+        log("WARN", "No reply after 10 hours => using 'default'")
         return "default"
 
-def wait_for_telegram_reply():
-    global LAST_UPDATE_ID
-    timeout = 36000  # 10 hours
-    start_time = time.time()
-    while time.time() - start_time < timeout:
+    def ask(self, msg, options=None):
+        if not self.drained:
+            self.drain_old_updates()
         try:
-            r = requests.get(TELEGRAM_GET_UPDATES_URL, params={"offset": LAST_UPDATE_ID + 1})
-            r.raise_for_status()
-            data = r.json()
-            if data.get("ok"):
-                for upd in data.get("result", []):
-                    upd_id = upd["update_id"]
-                    if upd_id > LAST_UPDATE_ID:
-                        LAST_UPDATE_ID = upd_id
-                        msg = upd.get("message", {})
-                        if msg.get("chat", {}).get("id") == int(TELEGRAM_CHAT_ID) and "text" in msg:
-                            reply = msg["text"]
-                            print("[DEBUG] Received Telegram reply:", reply)
-                            return reply
-            time.sleep(2)
+            self.send_message(msg, options)
+            log("DEBUG", "Sent Telegram:", msg)
         except Exception as e:
-            print("[ERROR] wait_for_telegram_reply =>", e)
-            break
-    print("[WARN] No reply after 10 hours => using 'default'")
-    return "default"
+            log("ERROR", "send_telegram_message =>", e)
+            return "default"
+        return self.wait_for_reply()
+
+telegram = TelegramClient(TELEGRAM_BOT_TOKEN, TELEGRAM_CHAT_ID)
+
+def drain_old_updates():
+    telegram.drain_old_updates()
+
+def send_telegram_message(msg, options=None):
+    return telegram.ask(msg, options)
+
+def wait_for_telegram_reply():
+    return telegram.wait_for_reply()
 
 def get_telegram_answer(question, options=None):
     ans = "default"
-    while ans.lower() == "default":
-        ans = send_telegram_message(question, options)
-        if ans.lower() == "default":
-            print("[WARN] No valid Telegram answer => retrying in 5 seconds...")
-            time.sleep(5)
+    with span("telegram_wait"):
+        while ans.lower() == "default":
+            ans = send_telegram_message(question, options)
+            if ans.lower() == "default":
+                log("WARN", "No valid Telegram answer => retrying in 5 seconds...")
+                pause(5, "telegram")
     return ans
 
+QUESTION_BROKER_ENABLED = os.getenv("QUESTION_BROKER", "1") != "0"
+NUMBERED_REPLY_PATTERN = re.compile(r"^\s*(\d+)\s*[:)]\s*(.+)$")
+PLACEHOLDER_OPTIONS = {"", "select an option"}
+
+def real_options(options):
+    return [o for o in options if o.strip().lower() not in PLACEHOLDER_OPTIONS]
+
+def match_option(options, ans):
+    # Option names are matched as text: "3" is the option "3", not the third.
+    ans = str(ans).strip().lower()
+    return next((o for o in real_options(options) if o.strip().lower() == ans), None)
+
+def option_for_reply(options, ans):
+    # A human on Telegram may also pick by the number shown in the prompt,
+    # which counts the real options only.
+    choice = match_option(options, ans)
+    if choice is None and ans.strip().isdigit():
+        real = real_options(options)
+        if 1 <= int(ans) <= len(real):
+            choice = real[int(ans) - 1]
+    return choice
+
+class QuestionBroker:
+    # Keeps unknown questions from blocking the run. While an application is
+    # being filled, cache misses are collected instead of asked one by one.
+    # If any are left, the application is parked, all of its questions go out
+    # as one numbered Telegram prompt, and the bot moves on. A background
+    # thread long-polls for replies; once every question of a parked job is
+    # answered, the job is handed back through pop_ready() for a retry.
+    def __init__(self, client, enabled=QUESTION_BROKER_ENABLED):
+        self.client = client
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._ready_event = threading.Event()
+        self._thread = None
+        self._collected = {}  # main thread only: misses of the application in progress
+        self._parked = {}     # job id -> {"job": job, "keys": set of question keys}
+        self._asked = {}      # question key -> question, sent and awaiting an answer
+        self._batches = {}    # telegram message_id -> question keys in prompt order
+        self._answers = {}    # question key -> (question, answer) not yet written back
+        self._resolved = set()
+        self._ready = []
+
+    def start(self):
+        if not self.enabled or (self._thread and self._thread.is_alive()):
+            return
+        self._thread = threading.Thread(target=self._run, name="question-broker", daemon=True)
+        self._thread.start()
+
+    def collect(self, question_text, question_type, options=None, reask=False):
+        # reask: the form rejected the answer this question already got, so
+        # it must go out again instead of counting as resolved.
+        key = answer_bank._make_key(question_text, question_type)
+        if key not in self._collected:
+            self._collected[key] = {
+                "key": key,
+                "text": question_text,
+                "type": question_type,
+                "options": list(options) if options else None,
+                "reask": reask
+            }
+        elif reask:
+            self._collected[key]["reask"] = True
+
+    def has_collected(self):
+        return bool(self._collected)
+
+    def discard_collected(self):
+        self._collected = {}
+
+    def park(self, job):
+        questions = list(self._collected.values())
+        self._collected = {}
+        with self._lock:
+            for q in questions:
+                if q["reask"]:
+                    self._resolved.discard(q["key"])
+                    self._answers.pop(q["key"], None)
+            self._parked[job["id"]] = {"job": job, "keys": {q["key"] for q in questions}}
+            new = [q for q in questions if q["key"] not in self._asked and q["key"] not in self._resolved]
+            for q in new:
+                self._asked[q["key"]] = q
+            self._check_ready_locked()
+        log("INFO", f"Parked '{job['title']}' with {len(questions)} open question(s), {len(new)} new.")
+        if new:
+            try:
+                sent = self.client.send_message(self._format_batch(job, new))
+                with self._lock:
+                    self._batches[sent["message_id"]] = [q["key"] for q in new]
+                log("DEBUG", "Sent batched Telegram prompt for", job["title"])
+            except Exception as e:
+                log("ERROR", "QuestionBroker.park =>", e)
+                with self._lock:
+                    for q in new:
+                        self._asked.pop(q["key"], None)
+                    self._parked.pop(job["id"], None)
+        self._wake.set()
+        return len(questions)
+
+    @staticmethod
+    def _format_batch(job, questions):
+        lines = [f"Job: {job['title']}", job["url"], "",
+                 "Reply to this message with one answer per line (or 'N: answer'):"]
+        for i, q in enumerate(questions, start=1):
+            lines.append(f"{i}) [{q['type']}] {q['text']}")
+            if q["options"]:
+                lines.append("    Options: " + " / ".join(f"{j}. {o}" for j, o in enumerate(real_options(q["options"]), start=1)))
+        return "\n".join(lines)
+
+    def pop_ready(self):
+        with self._lock:
+            ready, self._ready = self._ready, []
+            answers, self._answers = self._answers, {}
+            self._ready_event.clear()
+        return ready, answers
+
+    def is_parked(self, job_id):
+        with self._lock:
+            return job_id in self._parked or any(job["id"] == job_id for job in self._ready)
+
+    def wait_ready(self, timeout):
+        if timeout <= 0:
+            return False
+        return self._ready_event.wait(timeout)
+
+    def _check_ready_locked(self):
+        for job_id, entry in list(self._parked.items()):
+            if entry["keys"] <= self._resolved:
+                del self._parked[job_id]
+                self._ready.append(entry["job"])
+                self._ready_event.set()
+
+    def _run(self):
+        while True:
+            with self._lock:
+                waiting = bool(self._asked)
+            if not waiting:
+                self._wake.wait()
+                self._wake.clear()
+                continue
+            try:
+                for upd in self.client.get_updates():
+                    msg = upd.get("message", {})
+                    if self.client.is_own_chat(msg) and msg.get("text"):
+                        self._handle_reply(msg)
+            except Exception as e:
+                log("ERROR", "QuestionBroker poll =>", e)
+                time.sleep(10)
+
+    def _handle_reply(self, msg):
+        reply_to = msg.get("reply_to_message", {}).get("message_id")
+        with self._lock:
+            keys = self._batches.get(reply_to)
+            if keys is None:
+                keys = next(iter(self._batches.values()), None)
+            if keys is None:
+                return
+            got = self._parse_reply(msg["text"], keys)
+            for key, (q, ans) in got.items():
+                self._asked.pop(key, None)
+                self._answers[key] = (q, ans)
+                self._resolved.add(key)
+            for mid, batch_keys in list(self._batches.items()):
+                if not any(k in self._asked for k in batch_keys):
+                    del self._batches[mid]
+            missing = [str(i) for i, k in enumerate(keys, start=1) if k in self._asked]
+            self._check_ready_locked()
+        log("DEBUG", f"Telegram batch reply => {len(got)} answer(s), still open: {missing}")
+        if got and missing:
+            try:
+                self.client.send_message("Thanks! Still waiting on: " + ", ".join(missing))
+            except Exception as e:
+                log("ERROR", "QuestionBroker follow-up =>", e)
+
+    def _parse_reply(self, text, keys):
+        open_keys = [k for k in keys if k in self._asked]
+        lines = [line.strip() for line in text.splitlines() if line.strip()]
+        if len(open_keys) == 1 and len(lines) > 1:
+            lines = [text.strip()]
+        got = {}
+        for line in lines:
+            m = NUMBERED_REPLY_PATTERN.match(line)
+            if m and 1 <= int(m.group(1)) <= len(keys):
+                key, ans = keys[int(m.group(1)) - 1], m.group(2).strip()
+            else:
+                key, ans = next((k for k in open_keys if k not in got), None), line
+            if key is None or key not in self._asked:
+                continue
+            q = self._asked[key]
+            got[key] = (q, self._normalize_answer(q, ans))
+        return got
+
+    @staticmethod
+    def _normalize_answer(q, ans):
+        if not q["options"]:
+            return ans
+        return option_for_reply(q["options"], ans) or ans
+
+question_broker = QuestionBroker(telegram)
+
 #################################
-# 2) SELENIUM SETUP (MAC COMPAT)
+# 1b) ANSWER RESOLUTION TIERS
 #################################
-def get_chrome_version():
+# Every question of a form step goes through the tiers in ANSWER_TIERS order;
+# each tier sees only what the previous ones left open. A question is a dict
+# {"text", "type", "options", "reask"}; a tier returns {index: answer}.
+# Questions whose answer the form rejected (reask) skip straight to "human".
+ANSWER_TIERS = [t.strip() for t in os.getenv("ANSWER_TIERS", "exact,fuzzy,rules,llm,human").split(",") if t.strip()]
+
+def tier_exact(questions):
+    found = {}
+    for i, q in questions:
+        ans = answer_bank.get_answer(q["text"], q["type"])
+        if ans:
+            log("DEBUG", f"Using cached answer for '{q['type']}' question: {q['text']}")
+            found[i] = ans
+    return found
+
+def tier_fuzzy(questions):
+    found = {}
+    for i, q in questions:
+        fuzzy = answer_bank.get_answer_fuzzy(q["text"], q["type"], q["options"])
+        if fuzzy:
+            ans, score, matched_key = fuzzy
+            log("DEBUG", f"Using fuzzy cached answer ({score:.2f}) from '{matched_key}' for: {q['text']}")
+            found[i] = ans
+    return found
+
+ANSWER_RULES_FILE = os.getenv("ANSWER_RULES_FILE", os.path.join(SCRIPT_DIR, "answer_rules.json"))
+# Backreferences and conditionals (\1, (?P=name), (?(1)...)) point at group
+# numbers or names that do not survive inside the combined matcher.
+RULE_GROUP_REFERENCE = re.compile(r"(?<!\\)(?:\\\\)*\\[1-9]|\(\?P=|\(\?\(")
+
+class RuleEngine:
+    # Auto-answer and skip rules from answer_rules.json. Each rule has a name,
+    # "keywords" (substrings) and/or a "regex", optional "types" (text,
+    # dropdown, radio), optional "options" (for choice questions: the rule
+    # only fires if one of them is offered, and picks it) and an "answer"
+    # template formatted with the regex's named groups and {option}.
+    # "action": "skip" leaves the field alone. All rules are compiled into
+    # one pattern of optional lookaheads, one per rule, so a single match
+    # over the question text tells which rules fire; the first one in file
+    # order that fits the question's type and options wins.
+    def __init__(self, filepath=ANSWER_RULES_FILE):
+        self.rules = []
+        self.matcher = None
+        try:
+            with open(filepath, "r") as f:
+                rules = json.load(f).get("rules", [])
+        except FileNotFoundError:
+            log("INFO", f"No answer rules file at {filepath} => rules tier is empty.")
+            return
+        except (OSError, ValueError) as e:
+            log("ERROR", f"Could not load answer rules from {filepath} =>", e)
+            return
+        parts = []
+        for n, rule in enumerate(rules):
+            alts = [re.escape(k) for k in rule.get("keywords", [])]
+            if rule.get("regex"):
+                try:
+                    rule["compiled"] = re.compile(rule["regex"], re.IGNORECASE | re.DOTALL)
+                except re.error as e:
+                    log("ERROR", f"Answer rule '{rule.get('name', n)}' has a bad regex =>", e)
+                    continue
+                # Named groups are only read from the winning rule's own
+                # pattern; inside the combined matcher they must not clash.
+                alt = re.sub(r"\(\?P<\w+>", "(?:", rule["regex"])
+                if RULE_GROUP_REFERENCE.search(alt):
+                    log("ERROR", f"Answer rule '{rule.get('name', n)}' uses a backreference => skipped.")
+                    continue
+                try:
+                    re.compile(alt, re.IGNORECASE | re.DOTALL)
+                except re.error as e:
+                    log("ERROR", f"Answer rule '{rule.get('name', n)}' has a bad regex =>", e)
+                    continue
+                alts.append(alt)
+            if not alts:
+                continue
+            rule.setdefault("name", f"rule-{n}")
+            self.rules.append(rule)
+            parts.append(f"(?=.*?(?P<r{len(self.rules) - 1}>{'|'.join(alts)}))?")
+        if parts:
+            try:
+                self.matcher = re.compile("^" + "".join(parts), re.IGNORECASE | re.DOTALL)
+            except re.error as e:
+                log("ERROR", f"Could not combine the answer rules from {filepath} =>", e)
+                self.rules = []
+        log("DEBUG", f"Loaded {len(self.rules)} answer rules from {filepath}.")
+
+    def match(self, question):
+        # Returns (rule, answer) for the first rule that fires, else None.
+        # answer is None for skip rules.
+        if self.matcher is None:
+            return None
+        m = self.matcher.match(question["text"])
+        for n, rule in enumerate(self.rules):
+            if m.group(f"r{n}") is None:
+                continue
+            if rule.get("types") and question["type"] not in rule["types"]:
+                continue
+            if rule.get("action") == "skip":
+                return rule, None
+            answer = self._answer(rule, question)
+            if answer is not None:
+                return rule, answer
+        return None
+
+    def _answer(self, rule, question):
+        option = None
+        if question["options"] and rule.get("options"):
+            wanted = [o.lower() for o in rule["options"]]
+            option = next((o for o in real_options(question["options"]) if o.lower() in wanted), None)
+            if option is None:
+                return None
+        groups = {"option": option or ""}
+        if rule.get("compiled"):
+            rm = rule["compiled"].search(question["text"])
+            if rm:
+                groups.update({k: v or "" for k, v in rm.groupdict().items()})
+        template = rule.get("answer")
+        if template is None:
+            return option
+        try:
+            answer = template.format_map(groups)
+        except (KeyError, IndexError, ValueError) as e:
+            log("WARN", f"Answer rule '{rule['name']}' template failed =>", e)
+            return None
+        if question["options"]:
+            return validate_answer(question, answer)
+        return answer
+
+answer_rules = Lazy(RuleEngine)
+
+def rule_fired(rule):
+    metrics.inc("answer_rule_hits_total", rule=rule["name"])
+    count_in_spans("rule_hits")
+
+def tier_rules(questions):
+    found = {}
+    for i, q in questions:
+        hit = answer_rules.match(q)
+        if hit and hit[1] is not None:
+            rule_fired(hit[0])
+            log("DEBUG", f"Rule '{hit[0]['name']}' answered '{q['text']}' => {hit[1]}")
+            found[i] = hit[1]
+    return found
+
+LLM_BACKEND = os.getenv("LLM_BACKEND", "openai" if OPENAI_API_KEY else "off")
+LLM_MODEL = os.getenv("LLM_MODEL", "gpt-4o-mini")
+LLM_TIMEOUT = float(os.getenv("LLM_TIMEOUT", "20"))
+LLM_MIN_CONFIDENCE = float(os.getenv("LLM_MIN_CONFIDENCE", "0.8"))
+LLM_CONTEXT_ANSWERS = int(os.getenv("LLM_CONTEXT_ANSWERS", "40"))
+LLM_STUB_FILE = os.getenv("LLM_STUB_FILE")
+
+LLM_SYSTEM_PROMPT = (
+    "You fill in job application forms on behalf of a candidate. Use the candidate's known answers as facts. "
+    "Reply with a JSON object {\"answers\": [{\"id\": <question id>, \"answer\": <string>, \"confidence\": <0..1>}]}. "
+    "For questions with options the answer must be one of the options, verbatim. "
+    "Use a low confidence when the known answers do not support the answer."
+)
+
+class OpenAIAnswerBackend:
+    # One chat completion per form step, whatever the number of questions.
+    def __init__(self, model=LLM_MODEL, timeout=LLM_TIMEOUT):
+        self.model = model
+        self.timeout = timeout
+
+    def answer(self, questions, known):
+        lines = []
+        for n, q in enumerate(questions, start=1):
+            line = f"{n}. [{q['type']}] {q['text']}"
+            if q["options"]:
+                line += " | options: " + " / ".join(q["options"])
+            lines.append(line)
+        facts = "\n".join(f"- {k}: {v}" for k, v in known) or "(none)"
+        resp = openai.chat.completions.create(
+            model=self.model,
+            timeout=self.timeout,
+            temperature=0,
+            response_format={"type": "json_object"},
+            messages=[
+                {"role": "system", "content": LLM_SYSTEM_PROMPT},
+                {"role": "user", "content": f"Known answers:\n{facts}\n\nQuestions:\n" + "\n".join(lines)}
+            ]
+        )
+        payload = json.loads(resp.choices[0].message.content or "{}")
+        out = {}
+        for item in payload.get("answers", []):
+            try:
+                out[int(item["id"]) - 1] = (str(item["answer"]), float(item.get("confidence", 0)))
+            except (KeyError, TypeError, ValueError):
+                continue
+        return out
+
+class StubAnswerBackend:
+    # Deterministic offline stand-in: answers from a JSON file of
+    # {"question text": "answer"} (confidence 1.0), otherwise "Yes" for
+    # yes/no choices and nothing for the rest (confidence 0.5).
+    def __init__(self, filepath=None):
+        self.answers = {}
+        if filepath and os.path.exists(filepath):
+            with open(filepath, "r") as f:
+                self.answers = {normalize_question(k): v for k, v in json.load(f).items()}
+
+    def answer(self, questions, known):
+        out = {}
+        for n, q in enumerate(questions):
+            ans = self.answers.get(normalize_question(q["text"]))
+            if ans is not None:
+                out[n] = (str(ans), 1.0)
+            elif q["options"] and "yes" in [o.lower() for o in q["options"]]:
+                out[n] = ("Yes", 0.5)
+        return out
+
+def make_llm_backend():
+    if LLM_BACKEND == "openai":
+        return OpenAIAnswerBackend()
+    if LLM_BACKEND == "stub":
+        return StubAnswerBackend(LLM_STUB_FILE)
+    return None
+
+llm_backend = Lazy(make_llm_backend)
+
+def validate_answer(q, ans):
+    # Choice answers must name one of the current options, verbatim.
+    ans = (ans or "").strip()
+    if not ans:
+        return None
+    if not q["options"]:
+        return ans
+    return match_option(q["options"], ans)
+
+def tier_llm(questions):
+    backend = llm_backend.resolve()
+    if backend is None:
+        return {}
+    found, ask = {}, []
+    for i, q in questions:
+        memo = answer_bank.get_memo(q["text"], q["type"])
+        if memo:
+            ans = validate_answer(q, memo["answer"])
+            if ans is not None and memo["confidence"] >= LLM_MIN_CONFIDENCE:
+                log("DEBUG", f"Using memoized LLM answer ({memo['confidence']:.2f}) for: {q['text']}")
+                found[i] = ans
+            # A memoized low-confidence answer is not worth another request.
+            continue
+        ask.append((i, q))
+    if not ask:
+        return found
+    known = list(answer_bank.data.items())[-LLM_CONTEXT_ANSWERS:] if LLM_CONTEXT_ANSWERS > 0 else []
     try:
-        if platform.system() == "Darwin":
-            cmd = ["/Applications/Google Chrome.app/Contents/MacOS/Google Chrome", "--version"]
+        replies = backend.answer([q for _, q in ask], known)
+        metrics.inc("llm_requests_total", result="ok")
+    except Exception as e:
+        log("ERROR", "LLM tier =>", e)
+        metrics.inc("llm_requests_total", result="error")
+        return found
+    for n, (i, q) in enumerate(ask):
+        ans, confidence = replies.get(n, (None, 0.0))
+        ans = validate_answer(q, ans)
+        if ans is None:
+            continue
+        answer_bank.memoize(q["text"], q["type"], ans, confidence, type(backend).__name__)
+        if confidence >= LLM_MIN_CONFIDENCE:
+            log("DEBUG", f"LLM answer ({confidence:.2f}) for: {q['text']} => {ans}")
+            found[i] = ans
+    return found
+
+def tier_human(questions):
+    found = {}
+    for i, q in questions:
+        if q["reask"]:
+            log("INFO", f"Answer rejected by the form => asking again: {q['text']}")
+        if question_broker.enabled:
+            question_broker.collect(q["text"], q["type"], q["options"], q["reask"])
+            continue
+        if q["options"]:
+            ans = get_telegram_answer(q["text"], real_options(q["options"]))
+            ans = option_for_reply(q["options"], ans) or ans
         else:
-            cmd = ["google-chrome", "--version"]
+            ans = get_telegram_answer(q["text"])
+        answer_bank.add_answer(q["text"], q["type"], ans)
+        found[i] = ans
+    return found
+
+ANSWER_TIER_FUNCS = {
+    "exact": tier_exact,
+    "fuzzy": tier_fuzzy,
+    "rules": tier_rules,
+    "llm": tier_llm,
+    "human": tier_human
+}
+
+def resolve_answers(questions):
+    # Returns {index: answer}; unanswered questions are simply absent (with
+    # the broker on they have been collected for the step's park decision).
+    answers, source = {}, {}
+    answer_bank.refresh()
+    open_qs = [(i, q) for i, q in enumerate(questions) if not q["reask"]]
+    for tier in ANSWER_TIERS:
+        if tier == "human":
+            open_qs += [(i, q) for i, q in enumerate(questions) if q["reask"]]
+        if not open_qs:
+            continue
+        with span("answer_tier", tier=tier, questions=len(open_qs)) as sp:
+            found = ANSWER_TIER_FUNCS[tier](open_qs)
+            sp.attrs["resolved"] = len(found)
+        for i in found:
+            source[i] = tier
+        answers.update(found)
+        open_qs = [(i, q) for i, q in open_qs if i not in found]
+    for i, q in enumerate(questions):
+        result = source.get(i, "miss")
+        if result in ("human", "miss"):
+            result = "reask" if q["reask"] else "miss"
+            answer_bank.stats["miss"] += 1
+        else:
+            answer_bank.stats[result] += 1
+        metrics.inc("answer_lookups_total", result=result, type=q["type"])
+    return answers
+
+#################################
+# 2) SELENIUM SETUP (MAC COMPAT)
+#################################
+def chrome_binary():
+    if platform.system() == "Darwin":
+        return "/Applications/Google Chrome.app/Contents/MacOS/Google Chrome"
+    path = shutil.which("google-chrome")
+    return os.path.realpath(path) if path else "google-chrome"
+
+def get_chrome_version(binary=None):
+    try:
+        cmd = [binary or chrome_binary(), "--version"]
         r = subprocess.run(cmd, stdout=subprocess.PIPE, text=True)
         v = r.stdout.strip().split()[-1]
-        print(f"[INFO] Detected Chrome version: {v}")
+        log("INFO", f"Detected Chrome version: {v}")
         return v
     except Exception as e:
-        print("[ERROR] get_chrome_version =>", e)
+        log("ERROR", "get_chrome_version =>", e)
         return None
 
-chrome_version = get_chrome_version() or "latest"
-service = Service(ChromeDriverManager(driver_version=chrome_version).install())
+# The resolved Chrome version and chromedriver path are kept on disk, keyed
+# by the Chrome binary's size and mtime: a warm start only stats the binary
+# and skips both the version subprocess and the webdriver-manager lookup.
+DRIVER_CACHE_FILE = os.getenv("DRIVER_CACHE_FILE", "driver_cache.json")
 
-try:
-    ua = UserAgent().random
-except Exception:
-    ua = "Mozilla/5.0 (Windows NT 10.0; Win64; x64)"
-
-opts = Options()
-if platform.system() == "Darwin":
-    opts.binary_location = "/Applications/Google Chrome.app/Contents/MacOS/Google Chrome"
-opts.add_argument(f"user-agent={ua}")
-opts.add_argument("--disable-blink-features=AutomationControlled")
-opts.add_argument("--start-maximized")
-opts.add_argument("--disable-extensions")
-opts.add_argument("--no-sandbox")
-opts.add_argument("--disable-dev-shm-usage")
-
-driver = uc.Chrome(service=service, options=opts)
-stealth(
-    driver,
-    languages=["en-US", "en"],
-    vendor="Google Inc.",
-    platform="Win32",
-    webgl_vendor="Intel Inc.",
-    renderer="Intel Iris OpenGL Engine",
-    fix_hairline=True
-)
-wait = WebDriverWait(driver, 15)
+def chrome_fingerprint(binary):
+    try:
+        st = os.stat(binary)
+        return {"binary": binary, "size": st.st_size, "mtime": st.st_mtime}
+    except OSError:
+        return None
+
+def load_driver_cache():
+    try:
+        with open(DRIVER_CACHE_FILE, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def save_driver_cache(entry):
+    tmp = DRIVER_CACHE_FILE + ".tmp"
+    try:
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(entry, f, indent=2)
+        os.replace(tmp, DRIVER_CACHE_FILE)
+    except OSError as e:
+        log("WARN", "Could not write driver cache =>", e)
+
+def resolve_chromedriver():
+    # Returns {"chrome": fingerprint or None, "chrome_version", "chromedriver_path"}.
+    binary = chrome_binary()
+    fingerprint = chrome_fingerprint(binary)
+    cached = load_driver_cache()
+    if (fingerprint and cached.get("chrome") == fingerprint
+            and os.path.exists(cached.get("chromedriver_path", ""))):
+        log("DEBUG", f"Using cached chromedriver for Chrome {cached['chrome_version']}.")
+        metrics.inc("driver_cache_total", result="hit")
+        return cached
+    metrics.inc("driver_cache_total", result="miss")
+    from webdriver_manager.chrome import ChromeDriverManager
+    chrome_version = get_chrome_version(binary) or "latest"
+    path = ChromeDriverManager(driver_version=chrome_version).install()
+    entry = {"chrome": fingerprint, "chrome_version": chrome_version, "chromedriver_path": path}
+    if fingerprint:
+        save_driver_cache(entry)
+    return entry
+
+def random_user_agent():
+    try:
+        from fake_useragent import UserAgent
+        return UserAgent().random
+    except Exception:
+        return "Mozilla/5.0 (Windows NT 10.0; Win64; x64)"
+
+# One Chrome profile reused by every run and every recycled session, so the
+# login (and LinkedIn's own caches) survive restarts. Empty => a throwaway
+# profile per session. Two bots must not share a profile.
+CHROME_PROFILE_DIR = os.getenv("CHROME_PROFILE_DIR", os.path.join(SCRIPT_DIR, "chrome_profile"))
+
+# Lean mode keeps Chrome from fetching what the form flow never looks at
+# (images, fonts, video, trackers) and caps its caches and JS heap. Nothing
+# the bot selects on is blocked: cards, buttons and form fields are markup
+# and first-party scripts.
+LEAN_BROWSER = os.getenv("LEAN_BROWSER", "1") != "0"
+LEAN_WINDOW_SIZE = os.getenv("LEAN_WINDOW_SIZE", "1366,900")
+LEAN_DISK_CACHE_MB = int(os.getenv("LEAN_DISK_CACHE_MB", "32"))
+LEAN_JS_HEAP_MB = int(os.getenv("LEAN_JS_HEAP_MB", "512"))
+LEAN_BLOCKED_URLS = [
+    "*.png", "*.jpg", "*.jpeg", "*.gif", "*.webp", "*.avif", "*.ico",
+    "*.woff", "*.woff2", "*.ttf", "*.otf",
+    "*.mp4", "*.webm", "*.m3u8", "*.mp3",
+    "*media.licdn.com/dms/image*", "*media.licdn.com/playlist*",
+    "*px.ads.linkedin.com*", "*snap.licdn.com*", "*linkedin.com/li/track*",
+    "*doubleclick.net*", "*google-analytics.com*", "*googletagmanager.com*",
+    "*bat.bing.com*", "*connect.facebook.net*", "*ads-twitter.com*",
+] + [u.strip() for u in os.getenv("LEAN_EXTRA_BLOCKED_URLS", "").split(",") if u.strip()]
+# Blocked requests are never fetched, so what they would have cost is a
+# typical size per resource type rather than a measurement.
+LEAN_BLOCKED_BYTES_ESTIMATE = {"Image": 30_000, "Font": 40_000, "Media": 500_000, "Script": 60_000}
+
+def lean_options(opts):
+    w, h = LEAN_WINDOW_SIZE.split(",")
+    opts.add_argument(f"--window-size={w},{h}")
+    opts.add_argument(f"--disk-cache-size={LEAN_DISK_CACHE_MB * 1024 * 1024}")
+    opts.add_argument(f"--js-flags=--max-old-space-size={LEAN_JS_HEAP_MB}")
+    opts.add_argument("--blink-settings=imagesEnabled=false")
+    opts.add_argument("--disable-background-networking")
+    opts.add_argument("--renderer-process-limit=2")
+    # Network events feed report_page_traffic.
+    opts.set_capability("goog:loggingPrefs", {"performance": "ALL"})
+
+def lean_session(drv):
+    try:
+        drv.execute_cdp_cmd("Network.enable", {})
+        drv.execute_cdp_cmd("Network.setBlockedURLs", {"urls": LEAN_BLOCKED_URLS})
+        log("INFO", f"Lean browser mode: {len(LEAN_BLOCKED_URLS)} URL patterns blocked.")
+    except WebDriverException as e:
+        log("WARN", "Lean browser mode unavailable =>", e)
+
+def create_driver():
+    with span("driver_start"):
+        resolved = resolve_chromedriver()
+        version = resolved["chrome_version"].split(".")[0]
+        ua = random_user_agent()
+
+        opts = Options()
+        opts.add_argument(f"user-agent={ua}")
+        opts.add_argument("--disable-blink-features=AutomationControlled")
+        if CHROME_PROFILE_DIR:
+            os.makedirs(CHROME_PROFILE_DIR, exist_ok=True)
+            opts.add_argument(f"--user-data-dir={CHROME_PROFILE_DIR}")
+        if LEAN_BROWSER:
+            lean_options(opts)
+        else:
+            opts.add_argument("--start-maximized")
+        opts.add_argument("--disable-extensions")
+        opts.add_argument("--no-sandbox")
+        opts.add_argument("--disable-dev-shm-usage")
+
+        # undetected_chromedriver takes the driver and browser paths itself
+        # (it has no service argument); a known major version keeps it from
+        # probing Chrome again.
+        drv = uc.Chrome(
+            options=opts,
+            driver_executable_path=resolved["chromedriver_path"],
+            browser_executable_path=resolved["chrome"]["binary"] if resolved["chrome"] else None,
+            version_main=int(version) if version.isdigit() else None
+        )
+        stealth(
+            drv,
+            languages=["en-US", "en"],
+            vendor="Google Inc.",
+            platform="Win32",
+            webgl_vendor="Intel Inc.",
+            renderer="Intel Iris OpenGL Engine",
+            fix_hairline=True
+        )
+        if LEAN_BROWSER:
+            lean_session(drv)
+    return instrument_driver(drv)
+
+# The browser is started on first use (or handed in by tools such as the
+# replay benchmark through use_driver), so importing this module never
+# launches Chrome.
+driver = Lazy(create_driver)
+
+def use_driver(new_driver):
+    driver.bind(instrument_driver(new_driver))
+
+def instrument_driver(drv):
+    # Every WebDriver command (WebElement methods included) goes through
+    # drv.execute, so one wrapper times and counts all of them.
+    inner = drv.execute
+
+    def execute(driver_command, params=None):
+        t0 = time.perf_counter()
+        response = None
+        try:
+            response = inner(driver_command, params)
+            return response
+        except (InvalidSessionIdException, DriverConnectionError, ConnectionError):
+            session_watchdog.dead = True
+            raise
+        finally:
+            dur = time.perf_counter() - t0
+            metrics.observe("webdriver_command_seconds", dur, command=driver_command)
+            count_in_spans("webdriver_commands")
+            session_watchdog.sample_latency(driver_command, dur)
+            if PROFILE_WEBDRIVER:
+                webdriver_profiler.record(sys._getframe(1), driver_command, params, response, dur)
+
+    drv.execute = execute
+    return drv
+
+# A long-lived Chrome grows and slows down, and a dead one takes the module
+# globals with it. The watchdog samples the browser's memory and command
+# latency and, at a boundary between applications, replaces the session
+# once a threshold is crossed.
+WATCHDOG_INTERVAL = float(os.getenv("WATCHDOG_INTERVAL", "60"))
+WATCHDOG_MAX_RSS_MB = float(os.getenv("WATCHDOG_MAX_RSS_MB", "2500"))
+WATCHDOG_MAX_LATENCY = float(os.getenv("WATCHDOG_MAX_LATENCY", "1.5"))
+WATCHDOG_MAX_SESSION_HOURS = float(os.getenv("WATCHDOG_MAX_SESSION_HOURS", "24"))
+
+class SessionWatchdog:
+    # Page loads and async waits are slow by design and would drown the signal.
+    SLOW_COMMANDS = {Command.GET, Command.REFRESH, Command.W3C_EXECUTE_SCRIPT_ASYNC}
+    MIN_SAMPLES = 50
+
+    def __init__(self):
+        self.latencies = deque(maxlen=200)
+        self.started = time.time()
+        self.last_check = time.time()
+        self.dead = False
+        self.cookies = []
+        self.processes = []
+        self._psutil = None
+
+    def sample_latency(self, command, seconds):
+        if command not in self.SLOW_COMMANDS:
+            self.latencies.append(seconds)
+
+    def median_latency(self):
+        if len(self.latencies) < self.MIN_SAMPLES:
+            return 0.0
+        return sorted(self.latencies)[len(self.latencies) // 2]
+
+    def session_processes(self):
+        # chromedriver, Chrome and every renderer it spawned; empty when the
+        # processes cannot be inspected.
+        if self._psutil is None:
+            try:
+                import psutil
+                self._psutil = psutil
+            except ImportError:
+                log("WARN", "psutil not installed => browser memory is not watched.")
+                self._psutil = False
+        if not self._psutil or not driver.ready:
+            return []
+        drv = driver.resolve()
+        roots = [getattr(getattr(drv, "service", None), "process", None), getattr(drv, "browser_pid", None)]
+        pids = set()
+        for root in roots:
+            pid = root if isinstance(root, int) else getattr(root, "pid", None)
+            if pid is None:  # psutil.Process(None) is this very process
+                continue
+            try:
+                proc = self._psutil.Process(pid)
+                pids.add(proc.pid)
+                pids.update(child.pid for child in proc.children(recursive=True))
+            except (self._psutil.Error, ValueError):
+                continue
+        procs = []
+        for pid in pids:
+            try:
+                procs.append(self._psutil.Process(pid))
+            except self._psutil.Error:
+                pass
+        return procs
+
+    def browser_rss(self):
+        rss = 0
+        for proc in self.processes:
+            try:
+                rss += proc.memory_info().rss
+            except self._psutil.Error:
+                pass
+        return rss or None
+
+    def check(self):
+        # Returns why the session should be replaced, or None.
+        if self.dead:
+            return "dead"
+        if time.time() - self.last_check < WATCHDOG_INTERVAL:
+            return None
+        self.last_check = time.time()
+        try:
+            self.cookies = driver.get_cookies()
+        except (WebDriverException, DriverConnectionError, ConnectionError):
+            # A chromedriver that is gone refuses the connection instead of
+            # answering with a WebDriver error.
+            return "dead"
+        if self.dead:
+            return "dead"
+        # Remembered so a session whose chromedriver died can still be reaped.
+        self.processes = self.session_processes()
+        rss = self.browser_rss()
+        latency = self.median_latency()
+        if rss is not None:
+            metrics.set("browser_rss_bytes", rss)
+        metrics.set("webdriver_latency_median_seconds", latency)
+        if rss is not None and rss > WATCHDOG_MAX_RSS_MB * 1024 * 1024:
+            return "rss"
+        if latency > WATCHDOG_MAX_LATENCY:
+            return "latency"
+        if time.time() - self.started > WATCHDOG_MAX_SESSION_HOURS * 3600:
+            return "age"
+        return None
+
+    def recycle_if_needed(self):
+        # Call only where no WebElement of the current session is still
+        # needed. Returns True when the session was replaced.
+        if not driver.ready:
+            return False
+        reason = self.check()
+        if reason is None:
+            return False
+        log("WARN", f"Recycling the browser session (reason: {reason}).")
+        with span("driver_recycle", reason=reason):
+            if reason != "dead":
+                try:
+                    self.cookies = driver.get_cookies()
+                except (WebDriverException, DriverConnectionError, ConnectionError):
+                    pass
+            procs = set(self.session_processes()) | set(self.processes)
+            try:
+                driver.quit()
+            except Exception as e:
+                log("DEBUG", "Old session did not quit cleanly =>", e)
+            # A dead chromedriver cannot take its Chrome down with it.
+            for proc in procs:
+                try:
+                    proc.kill()
+                except self._psutil.Error:
+                    pass
+            driver.reset()
+            self.latencies.clear()
+            self.started = self.last_check = time.time()
+            self.dead = False
+            restore_session(self.cookies)
+            self.processes = self.session_processes()
+        metrics.inc("driver_recycles_total", reason=reason)
+        return True
+
+session_watchdog = SessionWatchdog()
+
+# Request types of in-flight requests, kept across drains because a request
+# may start before one report and finish after it.
+_request_types = {}
+
+def report_page_traffic(page):
+    # Drains the performance log of the page just loaded: bytes actually
+    # received, requests blocked by lean mode and their estimated size.
+    if not LEAN_BROWSER:
+        return
+    try:
+        entries = driver.get_log("performance")
+    except (WebDriverException, ValueError):
+        return
+    received = requests_done = blocked = saved = 0
+    for entry in entries:
+        try:
+            msg = json.loads(entry["message"])["message"]
+        except (KeyError, ValueError):
+            continue
+        method, params = msg.get("method"), msg.get("params", {})
+        if method == "Network.requestWillBeSent":
+            _request_types[params.get("requestId")] = params.get("type", "Other")
+        elif method == "Network.loadingFinished":
+            _request_types.pop(params.get("requestId"), None)
+            received += params.get("encodedDataLength", 0)
+            requests_done += 1
+        elif method == "Network.loadingFailed":
+            rtype = _request_types.pop(params.get("requestId"), params.get("type", "Other"))
+            if params.get("blockedReason"):
+                blocked += 1
+                saved += LEAN_BLOCKED_BYTES_ESTIMATE.get(rtype, 5_000)
+                metrics.inc("lean_blocked_requests_total", page=page, type=rtype)
+    if len(_request_types) > 5000:
+        _request_types.clear()
+    metrics.inc("page_bytes_received_total", received, page=page)
+    metrics.inc("page_requests_total", requests_done, page=page)
+    metrics.inc("lean_bytes_saved_estimate_total", saved, page=page)
+    count_in_spans("bytes_received", received)
+    count_in_spans("requests_blocked", blocked)
+    count_in_spans("bytes_saved_estimate", saved)
+    log("DEBUG", f"{page} page: {requests_done} requests, {received // 1024} KiB received, "
+                 f"{blocked} blocked (~{saved // 1024} KiB saved).")
 
 #################################
 # 3) UTILITY FUNCTIONS
 #################################
+# Every element the bot looks up by selector is a named target in
+# locators.json with an ordered chain of strategies ({"css": ...} or
+# {"xpath": ...}, "{job_id}"-style placeholders allowed); the first strategy
+# that finds anything wins. The whole chain runs in the page in one round
+# trip, which also times each strategy on its own. Tries, hits and latency
+# are recorded per strategy. Strategies with LOCATOR_PROMOTE_AFTER hits are
+# ordered by expected cost (time spent on all their tries, misses included,
+# per hit); one that misses LOCATOR_PROMOTE_AFTER times in a row while
+# another strategy hits drops to the back. Every LOCATOR_SAMPLE_EVERY-th
+# lookup of a target runs the whole chain, so the strategies behind the
+# leader keep being measured. The file is re-read when it changes, so a new
+# locator set ships without a code change. The built-in chains below are
+# the fallback for targets the file does not define.
+LOCATORS_FILE = os.getenv("LOCATORS_FILE", os.path.join(SCRIPT_DIR, "locators.json"))
+LOCATOR_PROMOTE_AFTER = int(os.getenv("LOCATOR_PROMOTE_AFTER", "3"))
+LOCATOR_SAMPLE_EVERY = int(os.getenv("LOCATOR_SAMPLE_EVERY", "20"))  # 0 => never
+DEFAULT_LOCATORS = {
+    "easy_apply_button": [{"xpath": "//button[contains(@class, 'jobs-apply-button')]"}],
+    "application_container": [{"xpath": "//div[contains(@aria-label,'Your job application progress is at ')]"}],
+    "next_button": [{"xpath": "//button[@data-easy-apply-next-button or contains(translate(text(),'CONTINUE','continue'),'continue')]"}],
+    "review_button": [{"xpath": "//button[@aria-label='Review your application']"}],
+    "submit_button": [{"xpath": "//button[@aria-label='Submit application']"}],
+    "done_button": [{"xpath": "//button[contains(@class,'artdeco-button--primary') and .//span[text()='Done']]"}],
+    "dismiss_button": [{"xpath": "//button[@aria-label='Dismiss']"}],
+    "discard_confirm_button": [{"xpath": "//button[@data-control-name='discard_application_confirm_btn' or .//span[text()='Discard']]"}],
+    "card_link": [
+        {"xpath": "//*[@data-job-id='{job_id}']//a[contains(@class, 'job-card-container__link')]"},
+        {"xpath": "//a[contains(@class, 'job-card-container__link') and contains(@href, '{job_id}')]"}
+    ],
+    "captcha_verify_button": [{"css": "#home_children_button"}],
+    "form_element": [{"css": "div[data-test-form-element], div[class*='jobs-easy-apply-form-element'], div[class*='artdeco-form-element']"}],
+}
+
+LOCATE_SCRIPT = """
+const [root, chain, sampleAll] = arguments;
+const scope = root || document;
+const timings = [];
+let hit = -1;
+let elements = [];
+for (let i = 0; i < chain.length; i++) {
+    const [kind, sel] = chain[i];
+    const t0 = performance.now();
+    let found = [];
+    try {
+        if (kind === "css") {
+            found = Array.from(scope.querySelectorAll(sel));
+        } else {
+            const r = document.evaluate(sel, scope, null, XPathResult.ORDERED_NODE_SNAPSHOT_TYPE, null);
+            for (let j = 0; j < r.snapshotLength; j++) found.push(r.snapshotItem(j));
+        }
+    } catch (e) {
+        timings.push([performance.now() - t0, -1]);
+        continue;
+    }
+    timings.push([performance.now() - t0, found.length]);
+    if (found.length && hit < 0) {
+        hit = i;
+        elements = found;
+        if (!sampleAll) break;
+    }
+}
+return {hit: hit, elements: elements, timings: timings};
+"""
+
+class LocatorRegistry:
+    KINDS = ("css", "xpath")
+
+    def __init__(self, filepath=LOCATORS_FILE):
+        self.filepath = filepath
+        self.targets = {}
+        self._mtime = None
+        self._stats = {}  # (target, kind, value) -> stats, kept across reloads
+        self._leaders = {}
+        self._lookups = {}
+        self._load()
+
+    def refresh(self):
+        try:
+            mtime = os.stat(self.filepath).st_mtime_ns
+        except OSError:
+            mtime = None
+        if mtime != self._mtime:
+            self._load()
+
+    def _load(self):
+        try:
+            self._mtime = os.stat(self.filepath).st_mtime_ns
+            with open(self.filepath, "r", encoding="utf-8") as f:
+                loaded = json.load(f)
+        except FileNotFoundError:
+            log("INFO", f"No locator file at {self.filepath} => built-in locators.")
+            loaded = {}
+        except (OSError, ValueError) as e:
+            log("ERROR", f"Could not load locators from {self.filepath} =>", e)
+            if self.targets:
+                return
+            loaded = {}
+        targets = {}
+        for name, chain in {**DEFAULT_LOCATORS, **loaded}.items():
+            strategies = []
+            for pos, strategy in enumerate(chain):
+                kind, value = next(iter(strategy.items()))
+                if kind not in self.KINDS:
+                    log("WARN", f"Locator {name}: unknown strategy '{kind}' => ignored.")
+                    continue
+                stats = self._stats.setdefault((name, kind, value), {
+                    "tries": 0, "hits": 0, "hit_s": 0.0, "total_s": 0.0, "streak": 0, "broken": False})
+                strategies.append({"kind": kind, "value": value, "pos": pos, "label": f"{kind}{pos}", "stats": stats})
+            targets[name] = strategies
+        self.targets = targets
+        log("DEBUG", f"Loaded {len(targets)} locator targets.")
+
+    def _ordered(self, name):
+        def rank(s):
+            st = s["stats"]
+            if st["streak"] >= LOCATOR_PROMOTE_AFTER or (st["tries"] >= LOCATOR_PROMOTE_AFTER and not st["hits"]):
+                return (2, s["pos"])
+            if st["hits"] >= LOCATOR_PROMOTE_AFTER:
+                return (0, st["total_s"] / st["hits"])
+            return (1, s["pos"])
+        return sorted((s for s in self.targets[name] if not s["stats"]["broken"]), key=rank)
+
+    def find(self, name, root=None, **params):
+        # All matches of the first strategy that finds any; [] if none does.
+        strategies = self._ordered(name)
+        chain = [[s["kind"], s["value"].format(**params) if params else s["value"]] for s in strategies]
+        self._lookups[name] = n = self._lookups.get(name, 0) + 1
+        sample = LOCATOR_SAMPLE_EVERY > 0 and (n - 1) % LOCATOR_SAMPLE_EVERY == 0
+        try:
+            result = driver.execute_script(LOCATE_SCRIPT, root, chain, sample)
+        except WebDriverException as e:
+            log("ERROR", f"Locator {name} lookup failed =>", e)
+            return []
+        for s, (ms, count) in zip(strategies, result["timings"]):
+            st = s["stats"]
+            if count < 0:
+                log("ERROR", f"Locator {name}/{s['label']} is not a valid {s['kind']} selector => disabled.")
+                st["broken"] = True
+                continue
+            st["tries"] += 1
+            st["total_s"] += ms / 1000
+            metrics.observe("locator_seconds", ms / 1000, target=name, strategy=s["label"])
+            if count:
+                st["hits"] += 1
+                st["hit_s"] += ms / 1000
+                st["streak"] = 0
+            elif result["hit"] >= 0:
+                # Only a miss while another strategy found the element says
+                # anything; nothing found at all is usually an absent element.
+                st["streak"] += 1
+            metrics.inc("locator_lookups_total", target=name, strategy=s["label"], result="hit" if count else "miss")
+        leader = next((s["label"] for s in self._ordered(name)), None)
+        if self._leaders.setdefault(name, leader) != leader:
+            log("INFO", f"Locator {name}: {leader} is now tried first (was {self._leaders[name]}).")
+            metrics.inc("locator_promotions_total", target=name, strategy=leader)
+            self._leaders[name] = leader
+        return result["elements"]
+
+    def find_one(self, name, root=None, **params):
+        found = self.find(name, root, **params)
+        return found[0] if found else None
+
+    def chain(self, name):
+        # [kind, value] pairs in the current order, for in-page lookups.
+        return [[s["kind"], s["value"]] for s in self._ordered(name)]
+
+    def css(self, name):
+        # For in-page code that can only take a CSS selector (closest()).
+        value = next((s["value"] for s in self._ordered(name) if s["kind"] == "css"), None)
+        if value is None:
+            value = next((s["css"] for s in DEFAULT_LOCATORS.get(name, []) if "css" in s), None)
+            log("ERROR", f"Locator {name} has no working CSS strategy => using the built-in one ({value}).")
+        return value
+
+    def report(self):
+        lines = [f"  {'target':<24}{'strategy':<10}{'tries':>7}{'hit %':>7}{'hit ms':>9}{'cost ms':>9}"]
+        for name, strategies in self.targets.items():
+            for s in self._ordered(name):
+                st = s["stats"]
+                if not st["tries"]:
+                    continue
+                mean = st["hit_s"] / st["hits"] * 1000 if st["hits"] else 0.0
+                cost = st["total_s"] / st["hits"] * 1000 if st["hits"] else float("inf")
+                lines.append(f"  {name:<24}{s['label']:<10}{st['tries']:>7}{st['hits'] / st['tries']:>7.0%}"
+                             f"{mean:>9.1f}{cost:>9.1f}")
+        return "Locators (current order):\n" + "\n".join(lines)
+
+locators = Lazy(LocatorRegistry)
+
 def safe_click(elem):
     driver.execute_script("arguments[0].scrollIntoView(true);", elem)
-    time.sleep(1)
+    pause(1, "scroll")
     try:
         elem.click()
     except ElementClickInterceptedException:
-        print("[WARN] Normal click intercepted => using JS fallback.")
+        log("WARN", "Normal click intercepted => using JS fallback.")
         driver.execute_script("arguments[0].click();", elem)
 
 def safe_send_keys(el, text, max_attempts=3):
     for attempt in range(max_attempts):
         try:
             driver.execute_script("arguments[0].scrollIntoView(true);", el)
-            time.sleep(1)
+            pause(1, "scroll")
             el.clear()
             el.send_keys(text)
             return
         except ElementNotInteractableException as e:
-            print(f"[WARN] Element not interactable (attempt {attempt+1}/{max_attempts}): {e}")
-            time.sleep(2)
-    print("[ERROR] Could not send keys => fallback to JS.")
+            log("WARN", f"Element not interactable (attempt {attempt+1}/{max_attempts}): {e}")
+            pause(2, "retry")
+    log("ERROR", "Could not send keys => fallback to JS.")
     driver.execute_script("arguments[0].value = arguments[1];", el, text)
 
-def get_form_state(main_container):
-    st = []
+# Cheap identity of the Easy Apply step on screen: the progress percentage
+# from the progress bar's aria-label plus the number of inline validation
+# errors. "modal" is a dialog without a progress bar (e.g. the post-submit
+# Done dialog), "none" means the modal is closed.
+STEP_FINGERPRINT_JS = """
+const fingerprint = () => {
+    const bar = document.querySelector("[aria-label^='Your job application progress is at ']");
+    if (bar) {
+        const m = (bar.getAttribute("aria-label") || "").match(/(\\d+)\\s*(?:%|percent)/);
+        const errors = document.querySelectorAll(".artdeco-inline-feedback--error").length;
+        return "progress:" + (m ? m[1] : "?") + "|errors:" + errors;
+    }
+    return document.querySelector(".jobs-easy-apply-modal, [role='dialog']") ? "modal" : "none";
+};
+"""
+
+STEP_STATE_SCRIPT = STEP_FINGERPRINT_JS + "return fingerprint();"
+
+# Resolves as soon as the step fingerprint differs from arguments[0] or one
+# of the [kind, selector] locators in arguments[1] matches, and at the latest
+# after arguments[2] ms. With arguments[3] false only the locators count.
+STEP_WAIT_SCRIPT = STEP_FINGERPRINT_JS + """
+const [before, targets, timeoutMs, anyChange] = arguments;
+const done = arguments[arguments.length - 1];
+const check = () => {
+    const now = fingerprint();
+    if (anyChange && now !== before) return {fingerprint: now, changed: true, target: null};
+    for (const [kind, sel] of targets) {
+        const hit = kind === "css"
+            ? document.querySelector(sel)
+            : document.evaluate(sel, document, null, XPathResult.FIRST_ORDERED_NODE_TYPE, null).singleNodeValue;
+        if (hit) return {fingerprint: now, changed: false, target: sel};
+    }
+    return null;
+};
+const first = check();
+if (first) return done(first);
+let timer = null;
+const observer = new MutationObserver(() => {
+    const r = check();
+    if (r) finish(r);
+});
+const finish = (r) => {
+    observer.disconnect();
+    clearTimeout(timer);
+    done(r);
+};
+observer.observe(document.body, {subtree: true, childList: true, attributes: true, attributeFilter: ["aria-label", "class"]});
+timer = setTimeout(() => finish({fingerprint: fingerprint(), changed: false, target: null, timeout: true}), timeoutMs);
+"""
+
+# Upper bound for one DOM wait; WebDriver's own async script timeout (30 s by
+# default) must stay above it.
+STEP_WAIT_TIMEOUT = float(os.getenv("STEP_WAIT_TIMEOUT", "10"))
+
+def step_of(fingerprint):
+    # The step itself, without the validation-error count.
+    return fingerprint.split("|")[0] if fingerprint else fingerprint
+
+def get_step_fingerprint():
     try:
-        items = main_container.find_elements(
-            By.XPATH,
-            ".//div[@data-test-form-element or contains(@class,'jobs-easy-apply-form-element') or contains(@class,'artdeco-form-element')]"
-        )
-        for i in items:
-            t = i.text.strip()
-            if t:
-                st.append(t)
+        return driver.execute_script(STEP_STATE_SCRIPT)
     except Exception as e:
-        print("[ERROR] get_form_state =>", e)
-    return tuple(st)
+        log("ERROR", "get_step_fingerprint =>", e)
+    return None
+
+def wait_for_step(before, targets=(), timeout=STEP_WAIT_TIMEOUT, reason="navigation", any_change=True):
+    # Event-driven replacement for a fixed sleep after a click: returns as
+    # soon as the modal changes step or a target (locator name) appears.
+    # any_change=False waits for a target only; the modal may pass through
+    # other states on the way (e.g. closing while a submit is in flight).
+    t0 = time.perf_counter()
+    chains = [pair for name in targets for pair in locators.chain(name)]
+    try:
+        result = driver.execute_async_script(STEP_WAIT_SCRIPT, before, chains, int(timeout * 1000), any_change)
+    except TimeoutException:
+        result = {"fingerprint": before, "changed": False, "target": None, "timeout": True}
+    except Exception as e:
+        log("ERROR", "wait_for_step =>", e)
+        result = {"fingerprint": None, "changed": False, "target": None, "timeout": True}
+    waited = time.perf_counter() - t0
+    outcome = "changed" if result["changed"] else ("target" if result["target"] else "timeout")
+    metrics.observe("dom_wait_seconds", waited, reason=reason, result=outcome)
+    count_in_spans("dom_wait_s", round(waited, 3))
+    if outcome == "timeout":
+        log("DEBUG", f"No step change after {timeout:.0f}s ({reason}).")
+    return result
 
 #################################
 # 4) LOGIN & CAPTCHA
 #################################
-def load_cookies():
-    print("[INFO] Using cookies from .env to log in.")
-    driver.get("https://www.linkedin.com")
-    driver.delete_all_cookies()
-    if LINKEDIN_LI_AT:
-        print(f"[DEBUG] Setting li_at: {LINKEDIN_LI_AT}")
-        driver.add_cookie({
-            "name": "li_at",
-            "value": LINKEDIN_LI_AT,
-            "domain": ".linkedin.com",
-            "path": "/",
-            "secure": True
-        })
-        print("[DEBUG] Set li_at cookie.")
-    else:
-        print("[WARN] LINKEDIN_LI_AT not set in .env")
-    if LINKEDIN_JSESSIONID:
-        print(f"[DEBUG] Setting JSESSIONID: {LINKEDIN_JSESSIONID}")
-        driver.add_cookie({
-            "name": "JSESSIONID",
-            "value": LINKEDIN_JSESSIONID,
-            "domain": ".linkedin.com",
-            "path": "/",
-            "secure": True
-        })
-        print("[DEBUG] Set JSESSIONID cookie.")
-    else:
-        print("[WARN] LINKEDIN_JSESSIONID not set in .env")
-    for i in range(5):
-        driver.refresh()
-        time.sleep(random.uniform(1,3))
+def env_cookies():
+    cookies = []
+    for name, value in (("li_at", LINKEDIN_LI_AT), ("JSESSIONID", LINKEDIN_JSESSIONID)):
+        if value:
+            cookies.append({"name": name, "value": value, "domain": ".linkedin.com", "path": "/", "secure": True})
+        else:
+            log("WARN", f"LINKEDIN_{name.upper()} not set in .env")
+    return cookies
+
+# A static linkedin.com page to run the session check from: setting cookies
+# and calling the API only need the origin, not a rendered feed.
+SESSION_CHECK_URL = "https://www.linkedin.com/robots.txt"
+# The first rendered page after login, where a CAPTCHA interstitial shows up.
+FEED_URL = "https://www.linkedin.com/feed/"
+EXIT_LOGIN_FAILED = 3
+
+# Asks the API who is logged in. The CSRF token LinkedIn expects is the
+# JSESSIONID cookie; without it there is no usable session.
+SESSION_CHECK_SCRIPT = """
+const done = arguments[arguments.length - 1];
+const m = document.cookie.match(/JSESSIONID="?([^";]+)"?/);
+if (!m) { done(0); return; }
+const ctl = new AbortController();
+setTimeout(() => ctl.abort(), arguments[0]);
+fetch("/voyager/api/me", {
+    credentials: "include",
+    signal: ctl.signal,
+    headers: {"csrf-token": m[1], "accept": "application/vnd.linkedin.normalized+json+2.1"}
+}).then(r => done(r.status)).catch(() => done(-1));
+"""
+SESSION_CHECK_TIMEOUT = 10
+
+def session_valid():
+    # Must run on a linkedin.com page (SESSION_CHECK_URL).
+    try:
+        status = driver.execute_async_script(SESSION_CHECK_SCRIPT, SESSION_CHECK_TIMEOUT * 1000)
+    except WebDriverException as e:
+        log("WARN", "Session check failed =>", e)
+        return False
+    log("DEBUG", f"Session check => HTTP {status}")
+    return status == 200
+
+def set_cookies(cookies):
+    restored = 0
+    for cookie in cookies:
+        if "linkedin.com" not in cookie.get("domain", ""):
+            continue
+        cookie = {k: v for k, v in cookie.items() if k in ("name", "value", "domain", "path", "secure", "httpOnly", "expiry")}
         try:
-            driver.find_element(By.XPATH, "//a[contains(@href,'feed')]")
-            print("[INFO] Logged in with cookies, attempt", i+1)
+            driver.add_cookie(cookie)
+            restored += 1
+        except WebDriverException as e:
+            log("DEBUG", f"Cookie {cookie['name']} not set =>", e)
+    return restored
+
+def log_in():
+    # The browser profile usually still holds a live session; the .env
+    # cookies are only injected when the check says it does not.
+    with span("login") as sp:
+        driver.get(SESSION_CHECK_URL)
+        if session_valid():
+            sp.attrs["via"] = "profile"
+            log("INFO", "Browser profile is still logged in.")
             return
-        except:
-            pass
-    print("[ERROR] Could not log in with cookies after attempts.")
+        log("INFO", "No valid session in the browser profile => using cookies from .env.")
+        cookies = env_cookies()
+        if cookies:
+            driver.delete_all_cookies()
+            set_cookies(cookies)
+            if session_valid():
+                sp.attrs["via"] = "cookies"
+                log("INFO", "Logged in with cookies from .env.")
+                return
+        sp.attrs["via"] = "failed"
+    log("ERROR", "LinkedIn rejected the session: refresh LINKEDIN_LI_AT and LINKEDIN_JSESSIONID in .env.")
     driver.quit()
-    exit()
+    sys.exit(EXIT_LOGIN_FAILED)
+
+def restore_session(cookies):
+    # Carries the login over to a freshly launched browser. With a profile
+    # the session is usually already there; otherwise the old session's
+    # cookies (or the .env ones if it died before they were read) are set,
+    # and checked like a fresh login.
+    driver.get(SESSION_CHECK_URL)
+    if CHROME_PROFILE_DIR and session_valid():
+        log("INFO", "New browser session is logged in through the profile.")
+        return
+    restored = set_cookies(cookies or env_cookies())
+    if session_valid():
+        log("INFO", f"New browser session with {restored} cookies restored.")
+        return
+    log("WARN", f"Restored {restored} cookies but the session is not valid => logging in again.")
+    log_in()
 
 def handle_captcha():
-    try:
-        v = driver.find_element(By.ID, "home_children_button")
-        print("[INFO] CAPTCHA detected => verifying.")
-        safe_click(v)
-        time.sleep(1.5)
-    except:
-        print("[INFO] No CAPTCHA detected.")
+    v = locators.find_one("captcha_verify_button")
+    if v is None:
+        log("INFO", "No CAPTCHA detected.")
+        return
+    log("INFO", "CAPTCHA detected => verifying.")
+    safe_click(v)
+    pause(1.5, "captcha")
 
 #################################
 # 5) FORM-FILLING
 #################################
-def is_resume_step(main_container):
-    txt = main_container.text.lower()
-    if any(k in txt for k in ["docx", "pdf", "updated resume", "upload resume"]):
-        return True
-    return False
-
-def fill_question_form(main_container):
-    if is_resume_step(main_container):
-        print("[INFO] Resume step detected => pressing Next.")
-        next_btns = main_container.find_elements(By.XPATH, ".//button[@data-easy-apply-next-button]")
-        if next_btns:
-            safe_click(next_btns[0])
-            time.sleep(2)
-        return
-    fill_text_fields(main_container)
-    fill_dropdowns(main_container)
-    fill_radio_buttons(main_container)
-
-def fill_text_fields(main_container):
-    skip_keywords = [
-        "search by title, skill, or company",
-        "city, state, or zip code"
-    ]
-    text_fields = main_container.find_elements(By.XPATH, ".//input[@type='text']")
-    for field in text_fields:
-        val = field.get_attribute("value") or ""
-        if val.strip():
-            print("[DEBUG] Text field already filled =>", val)
-            continue
-        question_text = extract_text_input_label(field)
-        print("[DEBUG] TEXT question =>", question_text)
-        if any(sk.lower() in question_text.lower() for sk in skip_keywords):
-            print("[DEBUG] Skipping text field =>", question_text)
-            continue
-        if "experience" in question_text.lower():
-            safe_send_keys(field, "5")
-            print("[DEBUG] Auto-filled experience field with 5.")
-        elif "salary" in question_text.lower():
-            safe_send_keys(field, "80000")
-            print("[DEBUG] Auto-filled salary field with 80000.")
-        else:
-            ans = get_answer_cached(question_text, "text")
-            safe_send_keys(field, ans)
-            print("[DEBUG] Filled text field:", question_text, "with", ans)
-        time.sleep(random.uniform(1,3))
+# Describes every field of the Easy Apply step in one round trip. Each field
+# gets a data-lnkd-handle attribute that stays put for the life of the DOM
+# node, and the question text is resolved the same way the old per-element
+# lookups did (text label, then visually-hidden spans, then container text,
+# minus lines that just repeat the options).
+FORM_SCHEMA_SCRIPT = """
+const root = arguments[0];
+const FORM_SEL = arguments[1];
+const txt = el => (el.innerText || "").trim();
+let seq = Number(root.getAttribute("data-lnkd-seq") || 0);
+const handleOf = el => {
+    let h = el.getAttribute("data-lnkd-handle");
+    if (!h) {
+        h = "f" + (++seq);
+        el.setAttribute("data-lnkd-handle", h);
+    }
+    return h;
+};
+const hiddenText = c => Array.from(c.querySelectorAll("span.visually-hidden"))
+    .map(txt).filter(Boolean).join(" ").trim();
+const questionOf = c => hiddenText(c) || txt(c);
+const errorOf = c => {
+    const e = c && c.querySelector(".artdeco-inline-feedback--error");
+    return e ? txt(e) : null;
+};
+const cleanLines = (q, labels, ignoreCase) => {
+    const norm = s => ignoreCase ? s.toLowerCase() : s;
+    const known = new Set(labels.map(norm));
+    return q.split("\\n").map(l => l.trim()).filter(l => !known.has(norm(l))).join("\\n").trim();
+};
+const fields = [];
+for (const el of root.querySelectorAll("input[type='text']")) {
+    const c = el.closest(FORM_SEL);
+    let q = "Open ended question";
+    if (c) {
+        const lab = c.querySelector("label[class*='artdeco-text-input__label']");
+        q = (lab && txt(lab)) || hiddenText(c) || txt(c) || q;
+    }
+    const error = errorOf(c);
+    if (error) q = cleanLines(q, [error], false) || q;
+    fields.push({handle: handleOf(el), type: "text", question: q, value: el.value || "",
+                 options: null, element: el, error: error});
+}
+for (const el of root.querySelectorAll("select")) {
+    const c = el.closest(FORM_SEL);
+    if (!c) continue;
+    const q = questionOf(c);
+    const options = Array.from(el.options).map(o => (o.text || "").trim()).filter(Boolean);
+    const error = errorOf(c);
+    fields.push({handle: handleOf(el), type: "dropdown", question: cleanLines(q, options.concat(error ? [error] : []), false) || q,
+                 value: el.value || "", options: options, element: el, error: error});
+}
+for (const fs of root.querySelectorAll("fieldset")) {
+    const inputs = Array.from(fs.querySelectorAll("input[type='radio']"));
+    if (!inputs.length) continue;
+    const c = fs.closest(FORM_SEL) || fs;
+    const labels = inputs.map(r => {
+        let l = (r.getAttribute("aria-label") || r.getAttribute("value") || "").trim();
+        if (!l && r.id) {
+            const lf = fs.querySelector("label[for='" + CSS.escape(r.id) + "']");
+            if (lf) l = txt(lf);
+        }
+        return l || "Option";
+    });
+    const q = questionOf(c);
+    const checked = inputs.findIndex(r => r.checked);
+    const error = errorOf(c);
+    fields.push({handle: handleOf(fs), type: "radio",
+                 question: cleanLines(q, labels.concat(error ? [error] : []), true) || q || "Open ended radio question",
+                 value: checked >= 0 ? labels[checked] : "", selected: checked >= 0,
+                 options: labels, element: fs, inputs: inputs, error: error});
+}
+root.setAttribute("data-lnkd-seq", String(seq));
+const body = (root.innerText || "").toLowerCase();
+const resume = ["docx", "pdf", "updated resume", "upload resume"].some(k => body.includes(k));
+return {resume: resume, fields: fields};
+"""
 
-def extract_text_input_label(field):
-    from selenium.common.exceptions import NoSuchElementException
-    try:
-        container = field.find_element(
-            By.XPATH,
-            "./ancestor::div[@data-test-form-element or contains(@class,'jobs-easy-apply-form-element') or contains(@class,'artdeco-form-element')]"
-        )
-    except NoSuchElementException:
-        return "Open ended question"
+def extract_form_schema(main_container):
     try:
-        label_el = container.find_element(By.XPATH, ".//label[contains(@class,'artdeco-text-input__label')]")
-        label_text = label_el.text.strip()
-        if label_text:
-            return label_text
-    except NoSuchElementException:
-        pass
-    hidden_spans = container.find_elements(By.CSS_SELECTOR, "span.visually-hidden")
-    combined_spans = [sp.text.strip() for sp in hidden_spans if sp.text.strip()]
-    if combined_spans:
-        return " ".join(combined_spans).strip()
-    cont_text = container.text.strip()
-    return cont_text if cont_text else "Open ended question"
-
-def fill_dropdowns(main_container):
-    containers = main_container.find_elements(
-        By.XPATH,
-        ".//div[@data-test-form-element or contains(@class,'jobs-easy-apply-form-element') or contains(@class,'artdeco-form-element')]"
-    )
-    for container in containers:
-        selects = container.find_elements(By.XPATH, ".//select")
-        if not selects:
+        schema = driver.execute_script(FORM_SCHEMA_SCRIPT, main_container, locators.css("form_element"))
+    except Exception as e:
+        log("ERROR", "extract_form_schema =>", e)
+        schema = None
+    return schema or {"resume": False, "fields": []}
+
+BATCHED_FILL = os.getenv("BATCHED_FILL", "1") != "0"
+
+def fill_question_form(main_container, restored=None):
+    # Returns {answer bank key: value} for every field written in this step.
+    with span("form_step") as sp:
+        schema = extract_form_schema(main_container)
+        sp.attrs["fields"] = len(schema["fields"])
+        if schema["resume"]:
+            log("INFO", "Resume step detected => leaving it to navigation.")
+            sp.attrs["resume"] = True
+            return {}
+        plan = resolve_form_answers(schema["fields"], restored)
+        apply_form_answers(plan)
+        return {p["key"]: p["value"] for p in plan}
+
+#################################
+# 5a) PHASE 1 - RESOLVE ANSWERS
+#################################
+def resolve_form_answers(fields, restored=None):
+    # Looks up every field of the step before anything on the page is touched:
+    # the open questions go through the answer tiers as one batch. Returns a
+    # write plan: one entry per field that needs a value, pointing at the
+    # element to write and the text/option to put there. `restored` holds
+    # answers checkpointed for this application before a crash; they are
+    # reused as-is unless the form rejected them. A step seen before in
+    # full replays its cached plan and skips all of that.
+    fingerprint = form_plans.fingerprint(fields) if FORM_PLAN_CACHE and fields else None
+    if fingerprint:
+        if any(f.get("error") for f in fields):
+            # The form refused something the plan would write again.
+            form_plans.invalidate(fingerprint, "validation error")
+        else:
+            cached = form_plans.lookup(fingerprint, fields)
+            if cached is not None:
+                log("INFO", f"Replaying cached answer plan for this step ({len(cached)} fields).")
+                return replay_plan(fields, cached)
+    restored = restored or {}
+    pending, answers = [], {}
+    for field in fields:
+        q = question_for_field(field)
+        if q is None:
             continue
-        hidden_spans = container.find_elements(By.CSS_SELECTOR, "span.visually-hidden")
-        question_text = ""
-        if hidden_spans:
-            combined = [sp.text.strip() for sp in hidden_spans if sp.text.strip()]
-            question_text = " ".join(combined).strip()
-        if not question_text:
-            question_text = container.text.strip()
-        for dd in selects:
-            current_val = dd.get_attribute("value") or ""
-            if current_val.strip() and current_val.lower() not in ["select an option", ""]:
-                print(f"[DEBUG] Dropdown already selected => {current_val}")
+        key = answer_bank._make_key(q["text"], q["type"])
+        if key in restored and not q["reask"]:
+            log("DEBUG", "Using checkpointed answer for:", q["text"])
+            answers[len(pending)] = restored[key]
+        pending.append((field, q, key))
+    open_idx = [n for n in range(len(pending)) if n not in answers]
+    resolved = resolve_answers([pending[n][1] for n in open_idx])
+    answers.update({open_idx[i]: ans for i, ans in resolved.items()})
+    plan = []
+    for n, (field, q, key) in enumerate(pending):
+        ans = answers.get(n)
+        if ans is None:
+            log("DEBUG", "No answer yet => leaving for the question broker:", q["text"])
+            continue
+        plan.append(plan_entry(field, key, ans))
+    # Only a step answered in full is worth replaying.
+    if fingerprint and plan and len(plan) == len(pending):
+        form_plans.save(fingerprint, fields, plan)
+    return plan
+
+def plan_entry(field, key, ans):
+    # "choice" is the index of the picked option; radio labels can repeat, so
+    # it is kept as chosen rather than looked up again from the value.
+    if field["type"] == "dropdown":
+        value = dropdown_choice(field["options"], ans)
+        return {"handle": field["handle"], "key": key, "type": "dropdown", "element": field["element"],
+                "value": value, "choice": field["options"].index(value)}
+    if field["type"] == "radio":
+        idx = radio_choice(field["options"], ans)
+        return {"handle": field["handle"], "key": key, "type": "radio", "element": field["inputs"][idx],
+                "value": field["options"][idx], "choice": idx}
+    return {"handle": field["handle"], "key": key, "type": "text", "element": field["element"], "value": ans,
+            "choice": None}
+
+def replay_plan(fields, cached):
+    # Cached entries point at fields by position and at options by index, so
+    # nothing is matched or resolved again. Fields the page already filled
+    # itself are left alone.
+    plan = []
+    for item in cached:
+        field = fields[item["i"]]
+        if field["type"] == "radio":
+            if field["selected"]:
                 continue
-            sel = Select(dd)
-            options = [o.text.strip() for o in sel.options if o.text.strip()]
-            if not options:
-                print("[WARN] No valid options in this dropdown => skipping.")
+            element = field["inputs"][item["choice"]]
+        else:
+            if field["value"].strip().lower() not in PLACEHOLDER_OPTIONS:
                 continue
-            q_lines = question_text.split("\n")
-            cleaned_lines = [line.strip() for line in q_lines if line.strip() not in options]
-            final_question_text = "\n".join(cleaned_lines).strip()
-            if not final_question_text:
-                final_question_text = question_text
-            print(f"[DEBUG] final_question_text => {final_question_text}")
-            print(f"[DEBUG] dropdown options => {options}")
-            ans = get_answer_cached(final_question_text, "dropdown", options)
-            matched = False
-            if ans.isdigit():
-                idx = int(ans) - 1
-                if 0 <= idx < len(options):
-                    sel.select_by_visible_text(options[idx])
-                    matched = True
-                    print(f"[DEBUG] Digit-based selection => {options[idx]}")
-            else:
-                for opt in options:
-                    if ans.lower() == opt.lower():
-                        sel.select_by_visible_text(opt)
-                        matched = True
-                        print(f"[DEBUG] Matched text => {opt}")
-                        break
-            if not matched:
-                if len(options) > 1:
-                    sel.select_by_index(1)
-                    print(f"[DEBUG] Defaulted to => {options[1]}")
-                else:
-                    sel.select_by_index(0)
-                    print(f"[DEBUG] Only one option => {options[0]}")
-            time.sleep(random.uniform(1,3))
-
-def fill_radio_buttons(main_container):
-    fieldsets = main_container.find_elements(By.XPATH, ".//fieldset[.//input[@type='radio']]")
-    for fs in fieldsets:
-        radio_inputs = fs.find_elements(By.XPATH, ".//input[@type='radio']")
-        if any(r.is_selected() for r in radio_inputs):
-            print("[DEBUG] Radio group already answered => skipping.")
-            continue
-        container = fs
+            element = field["element"]
+        plan.append({"handle": field["handle"], "key": item["key"], "type": field["type"],
+                     "element": element, "value": item["value"], "choice": item["choice"]})
+    return plan
+
+def rejected(field):
+    # A field that holds a value and still shows an inline validation error:
+    # the stored answer was refused, so only that field is asked again. Empty
+    # required fields flagged by an early Next click go the normal way.
+    if not field.get("error"):
+        return False
+    if field["type"] == "radio":
+        filled = field["selected"]
+    else:
+        filled = field["value"].strip().lower() not in PLACEHOLDER_OPTIONS
+    if filled:
+        log("WARN", f"Validation error on '{field['question']}' => {field['error']}")
+    return bool(filled)
+
+def question_for_field(field):
+    # The question a field still needs answered, or None if it is already
+    # filled in or is not a screening question at all.
+    reask = rejected(field)
+    question = {"text": field["question"], "type": field["type"], "options": field["options"], "reask": reask}
+    if reask:
+        return question
+    if field["type"] == "text":
+        if field["value"].strip():
+            log("DEBUG", "Text field already filled =>", field["value"])
+            return None
+        log("DEBUG", "TEXT question =>", field["question"])
+        question["options"] = None
+    elif field["type"] == "dropdown":
+        current_val = field["value"]
+        if current_val.strip().lower() not in PLACEHOLDER_OPTIONS:
+            log("DEBUG", f"Dropdown already selected => {current_val}")
+            return None
+        if not field["options"]:
+            log("WARN", "No valid options in this dropdown => skipping.")
+            return None
+    elif field["type"] == "radio":
+        if field["selected"]:
+            log("DEBUG", "Radio group already answered => skipping.")
+            return None
+    if field["type"] != "text":
+        log("DEBUG", f"final_question_text => {field['question']}")
+        log("DEBUG", f"{field['type']} options => {field['options']}")
+    hit = answer_rules.match(question)
+    if hit and hit[1] is None:
+        rule_fired(hit[0])
+        log("DEBUG", f"Skipping field (rule '{hit[0]['name']}') =>", field["question"])
+        return None
+    return question
+
+def dropdown_choice(options, ans):
+    choice = match_option(options, ans)
+    if choice is not None:
+        log("DEBUG", f"Matched text => {choice}")
+        return choice
+    real = real_options(options) or options
+    log("DEBUG", f"Defaulted to => {real[0]}")
+    return real[0]
+
+def radio_choice(labels, ans):
+    choice = match_option(labels, ans)
+    if choice is not None:
+        return labels.index(choice)
+    log("WARN", "No valid match => defaulting to first radio option")
+    return 0
+
+#################################
+# 5b) PHASE 2 - APPLY ANSWERS
+#################################
+# Writes the whole plan in one round trip. Values go through the native
+# setters and fire the input/change events the page's framework listens for;
+# handles of fields that did not take the value are returned for a fallback.
+APPLY_PLAN_SCRIPT = """
+const plan = arguments[0];
+const failed = [];
+const fire = (el, names) => names.forEach(n => el.dispatchEvent(new Event(n, {bubbles: true})));
+for (const p of plan) {
+    const el = p.element;
+    try {
+        if (!el || !el.isConnected || el.disabled || el.readOnly) {
+            failed.push(p.handle);
+            continue;
+        }
+        if (p.type === "text") {
+            const proto = el instanceof HTMLTextAreaElement ? HTMLTextAreaElement.prototype : HTMLInputElement.prototype;
+            el.focus();
+            Object.getOwnPropertyDescriptor(proto, "value").set.call(el, p.value);
+            fire(el, ["input", "change"]);
+            el.blur();
+            if (el.value !== p.value) failed.push(p.handle);
+        } else if (p.type === "dropdown") {
+            const idx = Array.from(el.options).findIndex(o => (o.text || "").trim() === p.value);
+            if (idx < 0) {
+                failed.push(p.handle);
+                continue;
+            }
+            el.selectedIndex = idx;
+            fire(el, ["input", "change"]);
+            if (el.selectedIndex !== idx) failed.push(p.handle);
+        } else if (p.type === "radio") {
+            el.click();
+            if (!el.checked) failed.push(p.handle);
+        }
+    } catch (e) {
+        failed.push(p.handle);
+    }
+}
+return failed;
+"""
+
+def apply_form_answers(plan):
+    if not plan:
+        return
+    if BATCHED_FILL:
         try:
-            container = fs.find_element(
-                By.XPATH,
-                "./ancestor::div[@data-test-form-element or contains(@class,'jobs-easy-apply-form-element') or contains(@class,'artdeco-form-element')]"
-            )
-        except NoSuchElementException:
-            pass
-        hidden_spans = container.find_elements(By.CSS_SELECTOR, "span.visually-hidden")
-        question_text = ""
-        if hidden_spans:
-            combined = [sp.text.strip() for sp in hidden_spans if sp.text.strip()]
-            question_text = " ".join(combined).strip()
-        if not question_text:
-            question_text = container.text.strip()
-        radio_inputs = fs.find_elements(By.XPATH, ".//input[@type='radio']")
-        radio_labels = []
-        for r in radio_inputs:
-            r_label = (r.get_attribute("aria-label") or r.get_attribute("value") or "").strip()
-            if not r_label:
-                rid = r.get_attribute("id") or ""
-                if rid:
-                    try:
-                        label_for = fs.find_element(By.XPATH, f".//label[@for='{rid}']")
-                        r_label = label_for.text.strip()
-                    except NoSuchElementException:
-                        pass
-            if not r_label:
-                r_label = "Option"
-            radio_labels.append(r_label)
-        if not radio_labels:
-            print("[WARN] No radio labels found => skipping fieldset.")
-            continue
-        q_lines = question_text.split("\n")
-        cleaned_lines = [line.strip() for line in q_lines if not any(line.strip().lower() == rl.lower() for rl in radio_labels)]
-        final_question_text = "\n".join(cleaned_lines).strip()
-        if not final_question_text:
-            final_question_text = question_text or "Open ended radio question"
-        print(f"[DEBUG] final_question_text => {final_question_text}")
-        print(f"[DEBUG] radio options => {radio_labels}")
-        prompt_text = f"Radio question: {final_question_text}\nOptions:\n" + "\n".join(f"{i+1}) {lab}" for i, lab in enumerate(radio_labels))
-        ans = get_answer_cached(final_question_text, "radio", radio_labels)
-        chosen_index = None
-        if ans.isdigit():
-            idx = int(ans) - 1
-            if 0 <= idx < len(radio_labels):
-                chosen_index = idx
-        else:
-            for i, lab in enumerate(radio_labels):
-                if ans.lower() == lab.lower():
-                    chosen_index = i
-                    break
-        if chosen_index is None:
-            chosen_index = 0
-            print("[WARN] No valid match => defaulting to first radio option")
-        safe_click(radio_inputs[chosen_index])
-        print(f"[DEBUG] Picked radio => {radio_labels[chosen_index]}")
-        time.sleep(random.uniform(1,3))
+            failed = set(driver.execute_script(APPLY_PLAN_SCRIPT, plan) or [])
+        except Exception as e:
+            log("WARN", "Batched fill failed => falling back per field:", e)
+            failed = {p["handle"] for p in plan}
+        log("DEBUG", f"Batched fill => {len(plan) - len(failed)}/{len(plan)} field(s) set in one call.")
+        for p in plan:
+            if p["handle"] in failed:
+                apply_answer_fallback(p)
+        pause(random.uniform(1,3), "pace")
+    else:
+        for p in plan:
+            apply_answer_fallback(p)
+            pause(random.uniform(1,3), "pace")
+
+def apply_answer_fallback(p):
+    log("DEBUG", f"Writing {p['type']} field {p['handle']} the slow way => {p['value']}")
+    with span("field", type=p["type"], handle=p["handle"]):
+        try:
+            if p["type"] == "text":
+                safe_send_keys(p["element"], p["value"])
+            elif p["type"] == "dropdown":
+                Select(p["element"]).select_by_visible_text(p["value"])
+            elif p["type"] == "radio":
+                safe_click(p["element"])
+        except Exception as e:
+            log("ERROR", f"Could not fill {p['type']} field {p['handle']} =>", e)
 
 #################################
 # 6) DYNAMIC NAVIGATION (ENTIRE DOM)
 #################################
 def attempt_dynamic_navigation():
-    next_buttons = driver.find_elements(
-        By.XPATH,
-        "//button[@data-easy-apply-next-button or contains(translate(text(),'CONTINUE','continue'),'continue')]"
-    )
+    # Clicks the step's navigation button and waits for the modal to react.
+    # Returns "next", "review", "submitted", "unconfirmed" (Submit clicked but
+    # no Done dialog) or None when the step has no navigation button.
+    before = get_step_fingerprint()
+    next_buttons = locators.find("next_button")
     if next_buttons:
         safe_click(next_buttons[0])
-        print("[INFO] Clicked Next/Continue.")
-        time.sleep(2)
-        return True
-    review_buttons = driver.find_elements(By.XPATH, "//button[@aria-label='Review your application']")
+        log("INFO", "Clicked Next/Continue.")
+        wait_for_step(before)
+        return "next"
+    review_buttons = locators.find("review_button")
     if review_buttons:
         safe_click(review_buttons[0])
-        print("[INFO] Clicked Review.")
-        time.sleep(2)
-        return True
-    submit_buttons = driver.find_elements(By.XPATH, "//button[@aria-label='Submit application']")
+        log("INFO", "Clicked Review.")
+        wait_for_step(before)
+        return "review"
+    submit_buttons = locators.find("submit_button")
     if submit_buttons:
         safe_click(submit_buttons[0])
-        print("[INFO] Clicked Submit.")
-        time.sleep(2)
-        for attempt in range(10):
-            done_buttons = driver.find_elements(
-                By.XPATH,
-                "//button[contains(@class,'artdeco-button--primary') and .//span[text()='Done']]"
-            )
-            if done_buttons:
-                safe_click(done_buttons[0])
-                print("[INFO] Clicked Done => Application submitted.")
-                time.sleep(2)
-                return "submitted"
-            else:
-                print("[WARN] No Done button found yet. Retrying in 2 seconds...")
-            time.sleep(2)
-        print("[ERROR] 'Done' not found after multiple tries.")
-        return False
-    print("[INFO] No Next/Continue/Review/Submit found => fill form.")
-    return False
+        log("INFO", "Clicked Submit.")
+        result = wait_for_step(before, ["done_button"], timeout=2 * STEP_WAIT_TIMEOUT, reason="submit",
+                               any_change=False)
+        done_buttons = locators.find("done_button")
+        if done_buttons:
+            safe_click(done_buttons[0])
+            log("INFO", "Clicked Done => Application submitted.")
+            wait_for_step(result["fingerprint"], timeout=STEP_WAIT_TIMEOUT, reason="done")
+            return "submitted"
+        log("ERROR", "'Done' not found after waiting for the submit to complete.")
+        return "unconfirmed"
+    log("INFO", "No Next/Continue/Review/Submit found.")
+    return None
 
 #################################
 # 7) APPLY LOGIC
 #################################
+# One round trip per search page: every card is reduced to a compact record
+# in the browser instead of pulling its outerHTML through WebDriver.
+# LinkedIn only renders the cards near the viewport; the rest of the list is
+# empty li[data-occludable-job-id] slots. The script scrolls those into view
+# until they are rendered (or CARD_RENDER_TIMEOUT runs out) before reading
+# the cards, and reports how many slots the page listed in total.
+CARD_RENDER_TIMEOUT = 5  # seconds
+CARD_EXTRACT_SCRIPT = r"""
+const done = arguments[arguments.length - 1];
+const deadline = Date.now() + arguments[0];
+const text = (el) => (el ? (el.innerText || el.textContent || "").trim() : "");
+const slots = () => Array.from(document.querySelectorAll("li[data-occludable-job-id]"));
+const extract = () => {
+    const out = [];
+    document.querySelectorAll(".job-card-container").forEach((card) => {
+        const link = card.querySelector("a.job-card-container__link");
+        if (!link) return;
+        const href = link.href || link.getAttribute("href") || "";
+        const m = href.match(/(?:\/jobs\/view\/|currentJobId=)(\d+)/);
+        const holder = card.closest("[data-job-id]") || card;
+        const id = holder.getAttribute("data-job-id") || (m ? m[1] : href);
+        const company = card.querySelector(
+            ".artdeco-entity-lockup__subtitle, .job-card-container__primary-description, .job-card-container__company-name"
+        );
+        const footer = Array.from(card.querySelectorAll("[class*='footer-item'], [class*='footer-job-state']"))
+            .map((li) => text(li).toLowerCase()).join(" | ");
+        const state = (footer || text(card).toLowerCase());
+        out.push({
+            id: String(id),
+            title: text(link).split("\n")[0],
+            company: text(company),
+            href: href,
+            applied: /\bapplied\b/.test(state),
+            in_progress: state.includes("in progress"),
+            easy_apply: footer ? footer.includes("easy apply") : null,
+            link: link
+        });
+    });
+    const ids = new Set(out.map((r) => r.id));
+    slots().forEach((li) => ids.add(li.getAttribute("data-occludable-job-id")));
+    done({cards: out, listed: ids.size});
+};
+const render = () => {
+    const empty = slots().filter((li) => !li.querySelector(".job-card-container"));
+    if (!empty.length || Date.now() > deadline) return extract();
+    empty[0].scrollIntoView({block: "center"});
+    setTimeout(render, 100);
+};
+render();
+"""
+
 def gather_job_cards():
-    cards = driver.find_elements(By.XPATH, "//div[contains(@class,'job-card-container')]")
+    # Returns (cards worth opening, ids of every rendered card, number of
+    # cards the page lists).
+    result = driver.execute_async_script(CARD_EXTRACT_SCRIPT, CARD_RENDER_TIMEOUT * 1000)
+    records = result["cards"]
+    if result["listed"] > len(records):
+        log("WARN", f"{result['listed'] - len(records)} job cards never rendered => not processed.")
     valid = []
-    for c in cards:
-        html = c.get_attribute("outerHTML").lower()
-        if "applied" in html or "in progress" in html:
-            print("[INFO] Skipping card (already applied/in progress).")
+    for r in records:
+        if r["applied"] or r["in_progress"]:
+            log("INFO", f"Skipping card {r['id']} (already applied/in progress).")
             continue
-        valid.append(c)
-    return valid
+        if r["easy_apply"] is False:
+            log("INFO", f"Skipping card {r['id']} (no Easy Apply badge).")
+            continue
+        valid.append(r)
+    return valid, [r["id"] for r in records], result["listed"]
 
-# Define a list of base URLs (LinkedIn and additional sites)
-BASE_URLS = [
-    "https://www.linkedin.com/jobs/search/?currentJobId=4179422278&distance=25&f_AL=true&f_TPR=r86400&geoId=103644278&keywords=cybersecurity%20analyst&origin=JOB_SEARCH_PAGE_JOB_FILTER&spellCorrectionEnabled=true",
-    "https://www.linkedin.com/jobs/search/?currentJobId=4181500420&distance=25&f_AL=true&f_TPR=r86400&geoId=103644278&keywords=penetration%20tester&origin=JOB_SEARCH_PAGE_SEARCH_BUTTON&refresh=true"
-    "https://www.linkedin.com/jobs/search/?currentJobId=4181551061&f_AL=true&f_TPR=r86400&geoId=103743442&keywords=it&origin=JOB_SEARCH_PAGE_SEARCH_BUTTON&refresh=true"# Replace with your additional website URL
-]
+def resolve_card_link(card):
+    # The list re-renders after an application, so the element captured by
+    # the extractor may be stale by the time its card comes up.
+    try:
+        card["link"].is_enabled()
+        return card["link"]
+    except (StaleElementReferenceException, AttributeError, KeyError):
+        pass
+    return locators.find_one("card_link", job_id=card["id"])
 
-def apply_to_jobs():
-    max_pages = 3
-    for base_url in BASE_URLS:
-        # For LinkedIn, we paginate; for others, we use the base URL as is.
-        if "linkedin.com" in base_url:
-            for page in range(1, max_pages + 1):
-                start = (page - 1) * 25
-                url = f"{base_url}&start={start}"
-                print("[INFO] Opening LinkedIn page", page, ":", url)
-                driver.get(url)
-                time.sleep(random.uniform(1,3))
-                process_job_cards()
-        else:
-            print("[INFO] Opening URL:", base_url)
-            driver.get(base_url)
-            time.sleep(random.uniform(1,3))
-            process_job_cards()
-
-def process_job_cards():
-    cards = gather_job_cards()
-    print(f"[INFO] Found {len(cards)} valid job cards.")
-    for idx, card in enumerate(cards, start=1):
-        print(f"[INFO] Processing card {idx}/{len(cards)}...")
+SEARCHES_FILE = os.getenv("SEARCHES_FILE", os.path.join(SCRIPT_DIR, "searches.json"))
+SEARCH_PAGE_SIZE = 25
+SEARCH_WINDOW_OVERLAP = 15 * 60  # seconds re-scanned before the last scan, for postings indexed late
+SEARCH_SEEN_LIMIT = 5000  # job ids remembered per search
+SEARCH_SEEN_SLOTS = SEARCH_SEEN_LIMIT // SEARCH_PAGE_SIZE  # pages of new ids kept, one record each
+
+class SearchScheduler:
+    # Job searches from searches.json. A search is either LinkedIn filters
+    # ("keywords", "geoId", "distance", extra "params") or a full "url"; it
+    # may set "priority" (higher runs first), "cadence_minutes",
+    # "max_pages", "initial_window_hours" (first scan) and "max_window_hours".
+    # Paging goes deeper only while pages keep listing job ids the search has
+    # not seen before (the seen set is persisted, capped at
+    # SEARCH_SEEN_LIMIT) and stops at the first page that is not full;
+    # each page's new ids are one record in a ring of SEARCH_SEEN_SLOTS per
+    # search, so a page costs one short appended line and the oldest page
+    # is overwritten (and compacted away) once the ring is full;
+    # max_pages is a hard cap. The posted-since filter (f_TPR) of every
+    # LinkedIn search covers only the time since that search's last
+    # successful scan, kept in search_state.jsonl, so a cycle does not
+    # re-page through postings it has already seen. After downtime it reaches
+    # back to that scan however long ago it was, unless max_window_hours caps
+    # it.
+    def __init__(self, config_path=SEARCHES_FILE, state_path="search_state.jsonl"):
+        self.state = JsonlStore(state_path)
+        self.searches = []
         try:
-            link = card.find_element(By.XPATH, ".//a[contains(@class, 'job-card-container__link')]")
-        except NoSuchElementException:
-            print("[WARN] No job link found => skipping card.")
-            continue
-        safe_click(link)
-        time.sleep(random.uniform(1,3))
+            with open(config_path, "r") as f:
+                searches = json.load(f).get("searches", [])
+        except (OSError, ValueError) as e:
+            log("ERROR", f"Could not load searches from {config_path} =>", e)
+            searches = []
+        for n, search in enumerate(searches):
+            if not search.get("keywords") and not search.get("url"):
+                log("WARN", f"Search #{n + 1} has neither keywords nor url => ignored.")
+                continue
+            search.setdefault("name", search.get("keywords") or search["url"])
+            search.setdefault("priority", 0)
+            search.setdefault("cadence_minutes", 120)
+            search.setdefault("max_pages", 10)
+            search.setdefault("initial_window_hours", 24)
+            search.setdefault("max_window_hours", None)
+            self.searches.append(search)
+        log("INFO", f"Loaded {len(self.searches)} searches from {config_path}.")
+
+    def last_scan(self, search):
+        return (self.state.get(search["name"]) or {}).get("last_scan")
+
+    def next_run(self, search):
+        last = self.last_scan(search)
+        return last + search["cadence_minutes"] * 60 if last else 0
+
+    def due(self, now=None):
+        now = now or time.time()
+        ready = [s for s in self.searches if self.next_run(s) <= now]
+        return sorted(ready, key=lambda s: -s["priority"])
+
+    def seconds_until_next(self, now=None):
+        now = now or time.time()
+        if not self.searches:
+            return 7200
+        return max(0, min(self.next_run(s) for s in self.searches) - now)
+
+    def window_seconds(self, search, now):
+        last = self.last_scan(search)
+        if not last:
+            return int(search["initial_window_hours"] * 3600)
+        window = max(now - last + SEARCH_WINDOW_OVERLAP, 3600)
+        if search["max_window_hours"]:
+            window = min(window, search["max_window_hours"] * 3600)
+        return int(window)
+
+    def is_linkedin(self, search):
+        return "url" not in search or "linkedin.com" in search["url"]
+
+    def page_url(self, search, page, now):
+        if "url" in search:
+            parts = urlsplit(search["url"])
+            params = dict(parse_qsl(parts.query))
+        else:
+            parts = urlsplit("https://www.linkedin.com/jobs/search/")
+            params = {"keywords": search["keywords"], "f_AL": "true"}
+            for key in ("geoId", "distance"):
+                if search.get(key) is not None:
+                    params[key] = str(search[key])
+            params.update({k: str(v) for k, v in search.get("params", {}).items()})
+        if not self.is_linkedin(search):
+            return search["url"]
+        params.pop("currentJobId", None)
+        params["f_TPR"] = f"r{self.window_seconds(search, now)}"
+        if page > 1:
+            params["start"] = str((page - 1) * SEARCH_PAGE_SIZE)
+        return urlunsplit(parts._replace(query=urlencode(params, quote_via=quote)))
+
+    def seen_slots(self, search):
+        for slot in range(SEARCH_SEEN_SLOTS):
+            rec = self.state.get(f"seen:{slot}:{search['name']}")
+            if rec:
+                yield rec
+
+    def seen_ids(self, search):
+        return {job_id for rec in self.seen_slots(search) for job_id in rec["ids"]}
+
+    def save_seen(self, search, new_ids):
+        if not new_ids:
+            return
+        seq = max((rec["seq"] for rec in self.seen_slots(search)), default=-1) + 1
+        key = f"seen:{seq % SEARCH_SEEN_SLOTS}:{search['name']}"
+        self.state.put(key, {"seq": seq, "ids": sorted(new_ids)})
+
+    def mark_scanned(self, search, started_at):
+        entry = dict(self.state.get(search["name"]) or {})
+        entry["last_scan"] = started_at
+        self.state.put(search["name"], entry)
+
+search_scheduler = Lazy(SearchScheduler)
+
+def run_search(search, first_page=1, started_at=None):
+    started_at = started_at or time.time()
+    linkedin = search_scheduler.is_linkedin(search)
+    max_pages = search["max_pages"] if linkedin else 1
+    seen = search_scheduler.seen_ids(search)
+    for page in range(first_page, max_pages + 1):
+        checkpoint.update(search=search["name"], search_started=started_at, page=page)
+        url = search_scheduler.page_url(search, page, started_at)
+        log("INFO", f"Opening '{search['name']}' page {page}: {url}")
+        before = set(seen)
+        session_watchdog.recycle_if_needed()
+        with span("search_page", url=url, page=page, search=search["name"]) as sp:
+            driver.get(url)
+            pause(random.uniform(1,3), "page_load")
+            report_page_traffic("search")
+            listed, new = process_job_cards(seen, url)
+            sp.attrs.update(listed=listed, new=new)
+        search_scheduler.save_seen(search, seen - before)
+        metrics.inc("search_pages_total", search=search["name"])
+        retry_parked_applications()
+        if not linkedin:
+            break
+        if new == 0:
+            log("INFO", f"Page {page} of '{search['name']}' had nothing new => stopping.")
+            break
+        if listed < SEARCH_PAGE_SIZE:
+            log("DEBUG", f"Page {page} of '{search['name']}' listed {listed} cards => last page.")
+            break
+    search_scheduler.mark_scanned(search, started_at)
+    checkpoint.clear("search", "search_started", "page")
+
+def apply_to_jobs():
+    due = search_scheduler.due()
+    log("INFO", f"{len(due)} of {len(search_scheduler.searches)} searches due.")
+    for search in due:
+        # A search interrupted by a crash continues at the page it was on,
+        # with its original scan start so its window still covers the gap.
+        resume = checkpoint.get("search") == search["name"]
+        if resume:
+            log("INFO", f"Resuming search '{search['name']}' at page {checkpoint.get('page')}.")
+            metrics.inc("checkpoint_resumes_total", boundary="search")
         try:
-            easy_apply_btn = driver.find_element(By.XPATH, "//button[contains(@class, 'jobs-apply-button')]")
-            safe_click(easy_apply_btn)
-            print("[INFO] Clicked Easy Apply.")
-        except NoSuchElementException:
-            print("[WARN] Easy Apply button not found => skipping job.")
-            continue
-        time.sleep(random.uniform(1,3))
+            if resume:
+                run_search(search, checkpoint.get("page", 1), checkpoint.get("search_started"))
+            else:
+                run_search(search)
+        except Exception as e:
+            # The search keeps its old cursor and its window simply grows.
+            log("ERROR", f"Search '{search['name']}' failed =>", e)
+            metrics.inc("search_failures_total", search=search["name"])
+
+# Set RECORD_FIXTURES_DIR to capture every Easy Apply step seen during a live
+# run as a replay fixture for bench/replay.py.
+RECORD_FIXTURES_DIR = os.getenv("RECORD_FIXTURES_DIR")
+
+RECORD_STEP_SCRIPT = """
+const root = arguments[0];
+const modal = root.closest("[role='dialog'], .jobs-easy-apply-modal") || root;
+return modal.outerHTML;
+"""
+
+def record_fixture_step(job, main_container, state):
+    job_dir = os.path.join(RECORD_FIXTURES_DIR, re.sub(r"[^\w.-]+", "_", str(job["id"])))
+    try:
+        os.makedirs(job_dir, exist_ok=True)
+        meta_path = os.path.join(job_dir, "meta.json")
+        meta = {"title": job["title"], "url": job["url"], "steps": [], "recorded_at": time.strftime("%Y-%m-%dT%H:%M:%S")}
+        if os.path.exists(meta_path):
+            with open(meta_path, "r") as f:
+                meta = json.load(f)
+        if step_of(state) in meta["steps"]:
+            return
+        meta["steps"].append(step_of(state))
+        with open(os.path.join(job_dir, f"step{len(meta['steps'])}.html"), "w") as f:
+            f.write(driver.execute_script(RECORD_STEP_SCRIPT, main_container))
+        answers_path = os.path.join(job_dir, "answers.json")
+        answers = {}
+        if os.path.exists(answers_path):
+            with open(answers_path, "r") as f:
+                answers = json.load(f)
+        for field in extract_form_schema(main_container)["fields"]:
+            key = answer_bank._make_key(field["question"], field["type"])
+            if answer_bank.data.get(key):
+                answers[key] = answer_bank.data[key]
+        with open(answers_path, "w") as f:
+            json.dump(answers, f, indent=4)
+        with open(meta_path, "w") as f:
+            json.dump(meta, f, indent=4)
+        log("DEBUG", f"Recorded fixture step {len(meta['steps'])} => {job_dir}")
+    except Exception as e:
+        log("WARN", "record_fixture_step =>", e)
+
+JOB_ID_PATTERN = re.compile(r"(?:/jobs/view/|currentJobId=)(\d+)")
+
+def job_from_card(card):
+    m = JOB_ID_PATTERN.search(card["href"])
+    job_id = m.group(1) if m else card["id"]
+    url = f"https://www.linkedin.com/jobs/view/{job_id}/" if job_id.isdigit() else card["href"]
+    job = {"id": job_id, "url": url, "title": card["title"] or job_id}
+    if card.get("company"):
+        job["company"] = card["company"]
+    return job
+
+def open_easy_apply():
+    # Returns (main application container, None) or (None, ledger outcome).
+    easy_apply_btn = locators.find_one("easy_apply_button")
+    if easy_apply_btn is None:
+        log("WARN", "Easy Apply button not found => skipping job.")
+        return None, "no-easy-apply"
+    safe_click(easy_apply_btn)
+    log("INFO", "Clicked Easy Apply.")
+    pause(random.uniform(1,3), "navigation")
+    container = locators.find_one("application_container")
+    if container is None:
+        log("ERROR", "Could not find main application container => skipping.")
+        return None, "stuck"
+    return container, None
+
+def discard_application():
+    try:
+        dismiss_buttons = locators.find("dismiss_button")
+        if dismiss_buttons:
+            before = get_step_fingerprint()
+            safe_click(dismiss_buttons[0])
+            wait_for_step(before, ["discard_confirm_button"], timeout=3, reason="discard")
+        confirm_buttons = locators.find("discard_confirm_button")
+        if confirm_buttons:
+            before = get_step_fingerprint()
+            safe_click(confirm_buttons[0])
+            wait_for_step(before, timeout=3, reason="discard")
+        log("INFO", "Discarded application modal.")
+    except Exception as e:
+        log("WARN", "discard_application =>", e)
+
+# Hard limits for one posting: a bad form can cost at most this many fill
+# rounds or this much wall time (waits inside a round are bounded as well).
+APPLICATION_STEP_BUDGET = int(os.getenv("APPLICATION_STEP_BUDGET", "15"))
+APPLICATION_TIME_BUDGET = float(os.getenv("APPLICATION_TIME_BUDGET", "300"))
+RESUME_MAX_ATTEMPTS = int(os.getenv("RESUME_MAX_ATTEMPTS", "1"))
+STUCK_REPEAT_LIMIT = int(os.getenv("STUCK_REPEAT_LIMIT", "3"))
+
+def run_application(job, restored=None):
+    checkpoint.update(job=job, step=None, answers=restored or {})
+    with span("application", job_id=job["id"], title=job["title"]) as sp:
+        flow = ApplicationFlow(job, restored)
         try:
-            main_app_container = driver.find_element(
-                By.XPATH,
-                "//div[contains(@aria-label,'Your job application progress is at ')]"
-            )
-        except NoSuchElementException:
-            print("[ERROR] Could not find main application container => skipping.")
-            continue
-        while True:
-            old_state = get_form_state(main_app_container)
-            nav = attempt_dynamic_navigation()
-            new_state = get_form_state(main_app_container)
-            if nav == "submitted":
-                print("[INFO] Application submitted => moving to next job.")
+            outcome, reason = flow.run()
+        finally:
+            webdriver_profiler.step = None
+        sp.attrs["outcome"] = outcome
+        sp.attrs["steps"] = flow.steps
+    metrics.inc("applications_total", outcome=outcome)
+    metrics.observe("application_steps", flow.steps, outcome=outcome)
+    job_ledger.record(job, outcome, reason)
+    checkpoint.clear("job", "step", "answers", "resume_attempts")
+    return outcome
+
+def give_up_application(job, reason):
+    log("WARN", f"Giving up on '{job['title']}' => {reason}")
+    metrics.inc("applications_total", outcome="stuck")
+    job_ledger.record(job, "stuck", reason)
+    checkpoint.clear("job", "step", "answers", "resume_attempts")
+
+def resume_application():
+    # Finishes the application a crash interrupted, with the answers it had.
+    # The attempt is counted in the checkpoint before it starts, so a posting
+    # that crashes the bot again is recorded as stuck on the next start
+    # instead of being resumed forever.
+    job = checkpoint.get("job")
+    if not job:
+        return
+    if job_ledger.skip_reason(job["id"]):
+        checkpoint.clear("job", "step", "answers", "resume_attempts")
+        return
+    attempts = checkpoint.get("resume_attempts", 0)
+    if attempts >= RESUME_MAX_ATTEMPTS:
+        give_up_application(job, f"crashed again after {attempts} resume attempt(s)")
+        return
+    checkpoint.update(resume_attempts=attempts + 1)
+    answers = checkpoint.get("answers") or {}
+    log("INFO", f"Resuming interrupted application '{job['title']}' ({len(answers)} answers restored).")
+    metrics.inc("checkpoint_resumes_total", boundary="application")
+    try:
+        driver.get(job["url"])
+        pause(random.uniform(1,3), "page_load")
+        report_page_traffic("job")
+        run_application(job, answers)
+    except InvalidSessionIdException:
+        raise
+    except WebDriverException as e:
+        give_up_application(job, f"resume: {type(e).__name__}")
+
+class ApplicationFlow:
+    # One Easy Apply attempt as an explicit state machine:
+    #   open -> fill -> navigate -> (fill | review | submit) -> done
+    # Any state can end in "abandoned" (budget spent, same step seen too
+    # often, questions parked, a WebDriver error on the page); the modal is
+    # then discarded. Every state handler returns the name of the next state.
+    TERMINAL = ("done", "abandoned")
+
+    def __init__(self, job, restored=None):
+        self.job = job
+        self.answers = dict(restored or {})
+        self.container = None
+        self.state = "open"
+        self.steps = 0
+        self.seen = {}
+        self.deadline = time.time() + APPLICATION_TIME_BUDGET
+        self.outcome, self.reason = None, None
+        webdriver_profiler.step = f"{job['id']} open"
+
+    def run(self):
+        while self.state not in self.TERMINAL:
+            if self.state != "open" and time.time() > self.deadline:
+                self.state = self.abandon("stuck", f"time budget of {APPLICATION_TIME_BUDGET:.0f}s spent")
                 break
-            if nav is True:
-                if new_state == old_state:
-                    print("[INFO] State unchanged => filling questions.")
-                    fill_question_form(main_app_container)
+            log("DEBUG", f"Application state => {self.state}")
+            try:
+                self.state = getattr(self, "on_" + self.state)()
+            except InvalidSessionIdException:
+                # The session is gone, not the posting: let the watchdog
+                # recycle it and the checkpoint resume the application.
+                raise
+            except WebDriverException as e:
+                log("DEBUG", "WebDriver error =>", e)
+                self.state = self.abandon("stuck", f"{type(e).__name__} in state {self.state}")
+        return self.outcome, self.reason
+
+    def abandon(self, outcome, reason, discard=True):
+        log("INFO" if outcome == "parked" else "WARN", f"Abandoning '{self.job['title']}' ({outcome}) => {reason}")
+        if discard:
+            discard_application()
+        self.outcome, self.reason = outcome, reason
+        return "abandoned"
+
+    def on_open(self):
+        self.container, outcome = open_easy_apply()
+        if self.container is None:
+            reason = "no Easy Apply button" if outcome == "no-easy-apply" else "no application container"
+            return self.abandon(outcome, reason, discard=outcome == "stuck")
+        question_broker.discard_collected()
+        return "fill"
+
+    def on_fill(self):
+        self.steps += 1
+        webdriver_profiler.step = f"{self.job['id']} step {self.steps}"
+        if self.steps > APPLICATION_STEP_BUDGET:
+            return self.abandon("stuck", f"step budget of {APPLICATION_STEP_BUDGET} spent")
+        fingerprint = get_step_fingerprint()
+        step = step_of(fingerprint)
+        self.seen[step] = self.seen.get(step, 0) + 1
+        if self.seen[step] > STUCK_REPEAT_LIMIT:
+            return self.abandon("stuck", f"step {step} came back {self.seen[step]} times")
+        if RECORD_FIXTURES_DIR and fingerprint:
+            record_fixture_step(self.job, self.container, fingerprint)
+        written = fill_question_form(self.container, self.answers)
+        if written:
+            self.answers.update(written)
+        checkpoint.update(step=fingerprint, answers=self.answers)
+        if question_broker.has_collected():
+            pending = question_broker.park(self.job)
+            return self.abandon("parked", f"{pending} unanswered question(s)")
+        return "navigate"
+
+    def on_navigate(self):
+        with span("navigate"):
+            action = attempt_dynamic_navigation()
+        if action == "review":
+            return "review"
+        if action == "submitted":
+            log("INFO", "Application submitted => moving to next job.")
+            self.outcome = "submitted"
+            return "done"
+        if action == "unconfirmed":
+            return self.abandon("stuck", "no confirmation after Submit")
+        # Next clicked (new step or validation errors) or no button at all:
+        # fill again; the repeat counter in on_fill catches a step that never moves.
+        return "fill"
+
+    def on_review(self):
+        # The review page normally only offers Submit; anything else
+        # (e.g. a late validation error) goes back through fill.
+        if locators.find("submit_button"):
+            return "submit"
+        return "fill"
+
+    def on_submit(self):
+        return self.on_navigate()
+
+def process_job_cards(seen=None, page_url=None):
+    # Returns (cards listed on the page, cards not in `seen`); `seen` is
+    # updated with every listed id.
+    cards, ids, listed = gather_job_cards()
+    new = len(ids)
+    if seen is not None:
+        new = sum(1 for job_id in ids if job_id not in seen)
+        seen.update(ids)
+    log("INFO", f"Found {len(cards)} valid job cards ({new} of {len(ids)} unseen).")
+    idx = 0
+    while idx < len(cards):
+        idx += 1
+        # The cards belong to the browser session; a recycled one reloads the
+        # page and carries on at the same position.
+        if idx > 1 and page_url and session_watchdog.recycle_if_needed():
+            driver.get(page_url)
+            pause(random.uniform(1,3), "page_load")
+            cards, _, _ = gather_job_cards()
+            if idx > len(cards):
+                break
+        card = cards[idx - 1]
+        log("INFO", f"Processing card {idx}/{len(cards)}...")
+        with span("card", index=idx):
+            job = job_from_card(card)
+            skip = job_ledger.skip_reason(job["id"])
+            if skip:
+                log("INFO", f"Skipping job {job['id']} (ledger: {skip}).")
+                metrics.inc("ledger_skips_total", outcome=skip)
                 continue
-            else:
-                if new_state == old_state:
-                    print("[INFO] No nav button and state unchanged => filling questions again.")
-                    fill_question_form(main_app_container)
-                else:
-                    print("[INFO] State changed => filling questions again just in case.")
-                    fill_question_form(main_app_container)
-                time.sleep(2)
+            link = resolve_card_link(card)
+            if link is None:
+                log("WARN", "No job link found => skipping card.")
+                continue
+            try:
+                safe_click(link)
+            except InvalidSessionIdException:
+                raise
+            except WebDriverException as e:
+                log("WARN", f"Could not open job {job['id']} => {type(e).__name__}")
+                metrics.inc("applications_total", outcome="stuck")
+                job_ledger.record(job, "stuck", f"card link: {type(e).__name__}")
+                continue
+            pause(random.uniform(1,3), "navigation")
+            report_page_traffic("job")
+            run_application(job)
+    return listed, new
+
+def retry_parked_applications():
+    jobs, answers = question_broker.pop_ready()
+    for q, ans in answers.values():
+        answer_bank.add_answer(q["text"], q["type"], ans)
+    for job in jobs:
+        log("INFO", "Retrying parked application =>", job["title"])
+        session_watchdog.recycle_if_needed()
+        driver.get(job["url"])
+        pause(random.uniform(1,3), "page_load")
+        report_page_traffic("job")
+        run_application(job)
 
 #################################
 # 8) MAIN - REPEAT FOREVER
 #################################
 def main():
+    start_metrics_server()
     drain_old_updates()
-    load_cookies()
+    question_broker.start()
+    log_in()
+    driver.get(FEED_URL)
+    pause(random.uniform(1,3), "page_load")
     handle_captcha()
+    resume_application()
     while True:
         apply_to_jobs()
-        print("[INFO] All pages processed. Sleeping 2 hours before re-checking...")
-        time.sleep(7200)  # 2 hours
+        retry_parked_applications()
+        locators.refresh()
+        if PROFILE_WEBDRIVER:
+            webdriver_profiler.write()
+        wait_s = max(60, search_scheduler.seconds_until_next())
+        log("INFO", f"Due searches processed. Next search due in {wait_s / 60:.0f} minutes.")
+        deadline = time.time() + wait_s
+        # Parked applications whose answers arrive during the pause are retried right away.
+        while question_broker.wait_ready(deadline - time.time()):
+            retry_parked_applications()
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,22 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import lnkedinbot as bot
+
+
+@pytest.fixture(autouse=True)
+def quiet(monkeypatch):
+    # No JSONL event log or console noise from the bot while testing.
+    monkeypatch.setattr(bot, "LOG_FILE", "")
+    monkeypatch.setattr(bot, "LOG_LEVEL", "ERROR")
+
+
+@pytest.fixture
+def answer_bank(tmp_path):
+    bank = bot.answer_bank.bind(bot.AnswerBank(str(tmp_path / "answer_bank.jsonl"), legacy_filepath=None))
+    yield bank
+    bot.answer_bank.reset()
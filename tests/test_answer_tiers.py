@@ -0,0 +1,96 @@
+import json
+
+import pytest
+
+import lnkedinbot as bot
+
+
+class CountingStub(bot.StubAnswerBackend):
+    def __init__(self, filepath):
+        super().__init__(filepath)
+        self.calls = []
+
+    def answer(self, questions, known):
+        self.calls.append([q["text"] for q in questions])
+        return super().answer(questions, known)
+
+
+class FakeBroker:
+    enabled = True
+
+    def __init__(self):
+        self.collected = []
+
+    def collect(self, text, qtype, options=None, reask=False):
+        self.collected.append(text)
+
+
+def question(text, qtype="text", options=None, reask=False):
+    return {"text": text, "type": qtype, "options": options, "reask": reask}
+
+
+@pytest.fixture
+def tiers(tmp_path, monkeypatch, answer_bank):
+    stub_file = tmp_path / "llm_stub.json"
+    stub_file.write_text(json.dumps({"Notice period in weeks?": "4"}))
+    rules_file = tmp_path / "answer_rules.json"
+    rules_file.write_text(json.dumps({"rules": [{"name": "sponsorship", "keywords": ["sponsorship"], "answer": "No"}]}))
+    backend = bot.llm_backend.bind(CountingStub(str(stub_file)))
+    bot.answer_rules.bind(bot.RuleEngine(str(rules_file)))
+    broker = FakeBroker()
+    monkeypatch.setattr(bot, "question_broker", broker)
+    monkeypatch.setattr(bot, "ANSWER_TIERS", ["exact", "fuzzy", "rules", "llm", "human"])
+    monkeypatch.setattr(bot, "LLM_MIN_CONFIDENCE", 0.8)
+    yield backend, broker
+    bot.llm_backend.reset()
+    bot.answer_rules.reset()
+
+
+def test_each_question_stops_at_the_first_tier_that_answers(tiers, answer_bank):
+    backend, broker = tiers
+    answer_bank.add_answer("How many years of Python experience?", "text", "5")
+    questions = [
+        question("How many years of Python experience?"),
+        question("Years of Python experience do you have?"),
+        question("Will you require sponsorship?"),
+        question("Notice period in weeks?"),
+        question("Willing to relocate?", "radio", ["Yes", "No"]),
+        question("Favourite colour?"),
+    ]
+    answers = bot.resolve_answers(questions)
+
+    assert answers == {0: "5", 1: "5", 2: "No", 3: "4"}
+    # Only what the earlier tiers left open reached the LLM, in one request.
+    assert backend.calls == [["Notice period in weeks?", "Willing to relocate?", "Favourite colour?"]]
+    assert broker.collected == ["Willing to relocate?", "Favourite colour?"]
+    assert {k: answer_bank.stats[k] for k in ("exact", "fuzzy", "rules", "llm", "miss")} == {
+        "exact": 1, "fuzzy": 1, "rules": 1, "llm": 1, "miss": 2}
+
+
+def test_llm_answers_are_memoized_with_their_confidence(tiers, answer_bank):
+    backend, _ = tiers
+    questions = [question("Notice period in weeks?"), question("Willing to relocate?", "radio", ["Yes", "No"])]
+    bot.resolve_answers(questions)
+
+    memo = answer_bank.get_memo("Notice period in weeks?", "text")
+    assert (memo["answer"], memo["confidence"], memo["source"]) == ("4", 1.0, "CountingStub")
+    assert answer_bank.get_memo("Willing to relocate?", "radio")["confidence"] == 0.5
+    # Machine answers never land in the human answer bank.
+    assert answer_bank.get_answer("Notice period in weeks?", "text") is None
+
+    # The second time both come from the memo: the confident one is used,
+    # the unsure one is not worth another request.
+    assert bot.resolve_answers(questions) == {0: "4"}
+    assert len(backend.calls) == 1
+
+
+def test_tier_order_is_configurable_and_reask_goes_to_a_human(tiers, answer_bank, monkeypatch):
+    backend, broker = tiers
+    answer_bank.add_answer("Notice period in weeks?", "text", "2")
+    monkeypatch.setattr(bot, "ANSWER_TIERS", ["llm", "exact", "human"])
+    assert bot.resolve_answers([question("Notice period in weeks?")]) == {0: "4"}
+
+    answers = bot.resolve_answers([question("Notice period in weeks?", reask=True)])
+    assert answers == {}
+    assert broker.collected == ["Notice period in weeks?"]
+    assert len(backend.calls) == 1
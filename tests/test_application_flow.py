@@ -0,0 +1,112 @@
+import pytest
+from selenium.common.exceptions import (
+    ElementNotInteractableException,
+    InvalidSessionIdException,
+    StaleElementReferenceException,
+    TimeoutException
+)
+
+import lnkedinbot as bot
+
+JOB = {"id": "42", "title": "Backend Engineer", "url": "https://www.linkedin.com/jobs/view/42/"}
+
+
+class IdleBroker:
+    enabled = True
+
+    def discard_collected(self):
+        pass
+
+    def has_collected(self):
+        return False
+
+
+@pytest.fixture
+def flow_env(tmp_path, monkeypatch):
+    ledger = bot.job_ledger.bind(bot.JobLedger(str(tmp_path / "job_ledger.jsonl")))
+    checkpoint = bot.checkpoint.bind(bot.Checkpoint(str(tmp_path / "checkpoint.json")))
+    discarded = []
+    monkeypatch.setattr(bot, "discard_application", lambda: discarded.append(True))
+    monkeypatch.setattr(bot, "question_broker", IdleBroker())
+    monkeypatch.setattr(bot, "open_easy_apply", lambda: ("container", None))
+    monkeypatch.setattr(bot, "get_step_fingerprint", lambda: "progress:50|errors:0")
+    monkeypatch.setattr(bot, "fill_question_form", lambda container, restored=None: {})
+    yield ledger, checkpoint, discarded
+    bot.job_ledger.reset()
+    bot.checkpoint.reset()
+
+
+def raise_(exc):
+    def handler(*args, **kwargs):
+        raise exc
+    return handler
+
+
+def test_webdriver_error_in_a_step_abandons_the_application(flow_env, monkeypatch):
+    ledger, checkpoint, discarded = flow_env
+    monkeypatch.setattr(bot, "attempt_dynamic_navigation", raise_(StaleElementReferenceException("gone")))
+
+    assert bot.run_application(JOB) == "stuck"
+    entry = ledger.get(JOB["id"])
+    assert (entry["outcome"], entry["reason"]) == ("stuck", "StaleElementReferenceException in state navigate")
+    assert discarded == [True]
+    assert checkpoint.get("job") is None
+    assert ledger.skip_reason(JOB["id"]) == "stuck"
+
+
+def test_webdriver_error_while_opening_is_contained(flow_env, monkeypatch):
+    ledger, _, _ = flow_env
+    monkeypatch.setattr(bot, "open_easy_apply", raise_(ElementNotInteractableException("covered")))
+
+    assert bot.run_application(JOB) == "stuck"
+    assert ledger.get(JOB["id"])["reason"] == "ElementNotInteractableException in state open"
+
+
+def test_a_dead_session_is_not_blamed_on_the_posting(flow_env, monkeypatch):
+    ledger, checkpoint, _ = flow_env
+    monkeypatch.setattr(bot, "attempt_dynamic_navigation", raise_(InvalidSessionIdException("dead")))
+
+    with pytest.raises(InvalidSessionIdException):
+        bot.run_application(JOB)
+    assert ledger.get(JOB["id"]) is None
+    assert checkpoint.get("job") == JOB
+
+
+def test_resume_records_stuck_after_one_failed_retry(flow_env, monkeypatch):
+    ledger, checkpoint, _ = flow_env
+    checkpoint.update(job=JOB, step=None, answers={})
+    checkpoint.update(resume_attempts=1)
+    monkeypatch.setattr(bot, "run_application", raise_(AssertionError("must not resume")))
+
+    bot.resume_application()
+    assert ledger.get(JOB["id"])["outcome"] == "stuck"
+    assert checkpoint.get("job") is None
+    assert checkpoint.get("resume_attempts") is None
+
+
+def test_resume_counts_the_attempt_before_starting(flow_env, monkeypatch, tmp_path):
+    _, checkpoint, _ = flow_env
+    checkpoint.update(job=JOB, step=None, answers={})
+
+    class CrashingDriver:
+        def get(self, url):
+            raise RuntimeError("chrome crashed")
+
+    monkeypatch.setattr(bot, "driver", CrashingDriver())
+    with pytest.raises(RuntimeError):
+        bot.resume_application()
+    assert bot.Checkpoint(str(tmp_path / "checkpoint.json")).get("resume_attempts") == 1
+
+
+def test_webdriver_error_during_resume_is_contained(flow_env, monkeypatch):
+    ledger, checkpoint, _ = flow_env
+    checkpoint.update(job=JOB, step=None, answers={})
+
+    class TimingOutDriver:
+        def get(self, url):
+            raise TimeoutException("page load")
+
+    monkeypatch.setattr(bot, "driver", TimingOutDriver())
+    bot.resume_application()
+    assert ledger.get(JOB["id"])["reason"] == "resume: TimeoutException"
+    assert checkpoint.get("job") is None
@@ -0,0 +1,41 @@
+import lnkedinbot as bot
+
+
+def fields():
+    return [
+        {"handle": "f0", "type": "text", "question": "Years of Python?", "options": None,
+         "element": "text-el", "value": "", "selected": False},
+        {"handle": "f1", "type": "radio", "question": "Relocate?", "options": ["Yes", "No", "Yes"],
+         "inputs": ["yes-1", "no", "yes-2"], "value": "", "selected": False},
+    ]
+
+
+def test_plan_round_trip_keeps_the_chosen_radio(tmp_path, answer_bank):
+    cache = bot.FormPlanCache(str(tmp_path / "form_plans.jsonl"))
+    page = fields()
+    fp = cache.fingerprint(page)
+    text = bot.plan_entry(page[0], "text::years of python?", "5")
+    radio = {"handle": "f1", "key": "radio::relocate?", "type": "radio", "element": "yes-2",
+             "value": "Yes", "choice": 2}
+    cache.save(fp, page, [text, radio])
+
+    cached = cache.lookup(fp, page)
+    assert [item["choice"] for item in cached] == [None, 2]
+    assert [p["element"] for p in bot.replay_plan(page, cached)] == ["text-el", "yes-2"]
+
+
+def test_changed_options_or_answers_drop_the_plan(tmp_path, answer_bank):
+    cache = bot.FormPlanCache(str(tmp_path / "form_plans.jsonl"))
+    page = fields()
+    fp = cache.fingerprint(page)
+    plan = [bot.plan_entry(page[0], "text::years of python?", "5"),
+            bot.plan_entry(page[1], "radio::relocate?", "No")]
+    cache.save(fp, page, plan)
+    assert plan[1]["choice"] == 1
+
+    answer_bank.add_answer("Years of Python?", "text", "6")
+    assert cache.lookup(fp, page) is None
+    cache.save(fp, page, plan)
+    page[1]["options"] = ["Yes", "No"]
+    assert cache.lookup(fp, page) is None
+    assert cache.stats == {"hit": 0, "miss": 0, "invalidated": 2}
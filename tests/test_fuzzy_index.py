@@ -0,0 +1,40 @@
+import lnkedinbot as bot
+
+
+def index(*questions):
+    idx = bot.FuzzyQuestionIndex()
+    for n, (text, qtype) in enumerate(questions):
+        idx.add(f"q{n}", text, qtype)
+    return idx
+
+
+def test_normalize_drops_stopwords_and_plurals():
+    assert bot.normalize_question("How many years of C++ do you have?") == {"year", "c++"}
+    assert bot.normalize_question("Do you have access?") == {"access"}
+
+
+def test_near_duplicates_match_within_their_type():
+    idx = index(("How many years of experience do you have with Python?", "text"),
+                ("How many years of Java experience?", "text"),
+                ("How many years of Python experience?", "dropdown"))
+    hits = idx.search("Years of Python experience", "text")
+    assert [key for _, key in hits] == ["q0"]
+    assert hits[0][0] == 1.0
+    assert idx.search("Years of Python experience", "radio") == []
+    assert idx.search("Are you willing to relocate?", "text") == []
+
+
+def test_removed_and_replaced_entries_are_not_found():
+    idx = index(("Are you authorized to work in the US?", "radio"))
+    idx.add("q0", "Do you need visa sponsorship?", "radio")
+    assert idx.search("Authorized to work in the US", "radio") == []
+    assert [key for _, key in idx.search("Need visa sponsorship", "radio")] == ["q0"]
+    idx.remove("q0")
+    assert idx.search("Need visa sponsorship", "radio") == []
+
+
+def test_answer_bank_fuzzy_answers_must_name_a_current_option(answer_bank):
+    answer_bank.add_answer("Are you willing to relocate?", "radio", "yes")
+    hit = answer_bank.get_answer_fuzzy("Willing to relocate?", "radio", ["Select an option", "Yes", "No"])
+    assert hit[0] == "Yes"
+    assert answer_bank.get_answer_fuzzy("Willing to relocate?", "radio", ["Maybe", "Never"]) is None
@@ -0,0 +1,78 @@
+import os
+
+import lnkedinbot as bot
+
+
+def lines(path):
+    with open(path, "rb") as f:
+        return f.read().splitlines()
+
+
+def test_last_write_wins_and_none_is_kept(tmp_path):
+    path = str(tmp_path / "store.jsonl")
+    store = bot.JsonlStore(path)
+    store.put("a", 1)
+    store.put("a", 2)
+    store.put("b", None)
+    assert bot.JsonlStore(path).data == {"a": 2, "b": None}
+
+
+def test_torn_tail_is_ignored_and_healed(tmp_path):
+    path = str(tmp_path / "store.jsonl")
+    bot.JsonlStore(path).put("a", 1)
+    with open(path, "ab") as f:
+        f.write(b'{"k": "b", "v"')
+    store = bot.JsonlStore(path)
+    assert store.data == {"a": 1}
+    store.put("c", 3)
+    assert bot.JsonlStore(path).data == {"a": 1, "c": 3}
+    assert lines(path)[-1] == b'{"k": "c", "v": 3}'
+
+
+def test_compaction_keeps_one_record_per_key(tmp_path):
+    path = str(tmp_path / "store.jsonl")
+    store = bot.JsonlStore(path, compact_ratio=2.0, compact_min=10)
+    for n in range(30):
+        store.put(f"k{n % 3}", n)
+    assert len(lines(path)) < 10
+    assert bot.JsonlStore(path).data == {"k0": 27, "k1": 28, "k2": 29}
+    assert not os.path.exists(path + ".tmp")
+
+
+def test_refresh_merges_an_external_append(tmp_path):
+    path = str(tmp_path / "store.jsonl")
+    seen = []
+    store = bot.JsonlStore(path, on_change=lambda changed, removed: seen.append((changed, removed)))
+    store.put("a", 1)
+    assert store.refresh() is False
+    bot.JsonlStore(path).put("b", 2)
+    assert store.refresh() is True
+    assert store.data == {"a": 1, "b": 2}
+    assert seen == [({"b"}, set())]
+
+
+def test_refresh_reloads_an_external_rewrite(tmp_path):
+    path = str(tmp_path / "store.jsonl")
+    seen = []
+    store = bot.JsonlStore(path, on_change=lambda changed, removed: seen.append((changed, removed)))
+    store.put("a", 1)
+    store.put("b", 2)
+    data = store.data
+    with open(path + ".edit", "w") as f:
+        f.write('{"k": "a", "v": 10}\n')
+    os.replace(path + ".edit", path)
+    assert store.refresh() is True
+    assert store.data is data
+    assert data == {"a": 10}
+    assert seen == [({"a"}, {"b"})]
+
+
+def test_appends_after_a_compaction_are_merged(tmp_path):
+    path = str(tmp_path / "store.jsonl")
+    store = bot.JsonlStore(path, compact_ratio=2.0, compact_min=10)
+    for n in range(30):
+        store.put(f"k{n % 3}", n)
+    other = bot.JsonlStore(path)
+    store.put("k3", 30)
+    assert other.refresh() is True
+    assert other.data["k3"] == 30
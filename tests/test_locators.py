@@ -0,0 +1,61 @@
+import json
+
+import pytest
+
+import lnkedinbot as bot
+
+
+class FakeDriver:
+    # Answers LOCATE_SCRIPT with canned per-strategy (ms, count) pairs, the
+    # way the in-page script would.
+    def __init__(self, results):
+        self.results = results
+        self.chains = []
+
+    def execute_script(self, script, root, chain, sample_all):
+        self.chains.append([value for _, value in chain])
+        timings, hit = [], -1
+        for i, (_, value) in enumerate(chain):
+            ms, count = self.results[value]
+            timings.append([ms, count])
+            if count and hit < 0:
+                hit = i
+                if not sample_all:
+                    break
+        return {"hit": hit, "elements": ["el"] if hit >= 0 else [], "timings": timings}
+
+
+@pytest.fixture
+def registry(tmp_path, monkeypatch):
+    path = tmp_path / "locators.json"
+    path.write_text(json.dumps({"thing": [{"css": "slow"}, {"css": "fast"}]}))
+    monkeypatch.setattr(bot, "LOCATOR_PROMOTE_AFTER", 3)
+    monkeypatch.setattr(bot, "LOCATOR_SAMPLE_EVERY", 2)
+    yield bot.LocatorRegistry(str(path))
+    bot.driver.reset()
+
+
+def test_sampling_promotes_the_cheaper_strategy(registry):
+    drv = bot.driver.bind(FakeDriver({"slow": (9.0, 1), "fast": (1.0, 1)}))
+    for _ in range(6):
+        assert registry.find("thing") == ["el"]
+    assert drv.chains[0] == ["slow", "fast"]
+    assert registry.chain("thing") == [["css", "fast"], ["css", "slow"]]
+
+
+def test_a_strategy_that_keeps_missing_is_demoted(registry):
+    drv = bot.driver.bind(FakeDriver({"slow": (1.0, 0), "fast": (5.0, 1)}))
+    for _ in range(3):
+        registry.find("thing")
+    assert registry.chain("thing")[0] == ["css", "fast"]
+    # Nothing found anywhere is not held against either strategy.
+    drv.results = {"slow": (1.0, 0), "fast": (1.0, 0)}
+    assert registry.find("thing") == []
+    assert registry.targets["thing"][1]["stats"]["streak"] == 0
+
+
+def test_css_falls_back_to_the_built_in_selector(tmp_path):
+    path = tmp_path / "locators.json"
+    path.write_text(json.dumps({"form_element": [{"xpath": "//div[@data-test-form-element]"}]}))
+    registry = bot.LocatorRegistry(str(path))
+    assert registry.css("form_element") == bot.DEFAULT_LOCATORS["form_element"][0]["css"]
@@ -0,0 +1,35 @@
+import lnkedinbot as bot
+
+YEARS = ["Select an option", "0", "1", "2", "3"]
+
+
+def test_telegram_reply_may_pick_by_number():
+    assert bot.option_for_reply(YEARS, "3") == "3"
+    assert bot.option_for_reply(["Select an option", "Yes", "No"], "2") == "No"
+    assert bot.option_for_reply(["Select an option", "Yes", "No"], "3") is None
+
+
+def test_dropdown_choice_prefers_text_and_skips_placeholder():
+    assert bot.dropdown_choice(YEARS, "3") == "3"
+    assert bot.dropdown_choice(YEARS, "0") == "0"
+    assert bot.dropdown_choice(YEARS, "seven") == "0"
+    assert bot.dropdown_choice(["Only"], "x") == "Only"
+
+
+def test_radio_choice_matches_text():
+    assert bot.radio_choice(["1", "2", "3"], "3") == 2
+    assert bot.radio_choice(["Yes", "No"], "NO") == 1
+    assert bot.radio_choice(["Yes", "No"], "2") == 0
+
+
+def choice(options):
+    return {"text": "How many years?", "type": "dropdown", "options": options, "reask": False}
+
+
+def test_validate_answer_matches_option_text():
+    assert bot.validate_answer(choice(YEARS), "3") == "3"
+    assert bot.validate_answer(choice(["Yes", "No"]), " no ") == "No"
+    assert bot.validate_answer(choice(["Yes", "No"]), "2") is None
+    assert bot.validate_answer(choice(YEARS), "select an option") is None
+    assert bot.validate_answer(choice(None), " five ") == "five"
+    assert bot.validate_answer(choice(YEARS), "") is None
@@ -0,0 +1,101 @@
+import lnkedinbot as bot
+
+
+class FakeTelegram:
+    def __init__(self):
+        self.sent = []
+
+    def send_message(self, text, options=None):
+        self.sent.append(text)
+        return {"message_id": len(self.sent)}
+
+    def get_updates(self):
+        return []
+
+    def is_own_chat(self, msg):
+        return True
+
+
+JOB = {"id": "42", "title": "Backend Engineer", "url": "https://www.linkedin.com/jobs/view/42/"}
+
+
+def reply(broker, message_id, text):
+    broker._handle_reply({"text": text, "reply_to_message": {"message_id": message_id}})
+
+
+def test_batch_reply_readies_job(answer_bank):
+    client = FakeTelegram()
+    broker = bot.QuestionBroker(client)
+    broker.collect("Years of Python?", "text")
+    broker.collect("Remote?", "radio", ["Yes", "No"])
+    broker.park(JOB)
+    assert len(client.sent) == 1
+    assert not broker.pop_ready()[0]
+
+    reply(broker, 1, "2: no\n1: five")
+    ready, answers = broker.pop_ready()
+    assert ready == [JOB]
+    assert {q["text"]: ans for q, ans in answers.values()} == {"Years of Python?": "five", "Remote?": "No"}
+
+
+def test_rejected_answer_is_asked_again(answer_bank):
+    client = FakeTelegram()
+    broker = bot.QuestionBroker(client)
+    broker.collect("Years of Python?", "text")
+    broker.park(JOB)
+    reply(broker, 1, "five")
+    assert broker.pop_ready()[0] == [JOB]
+
+    # The retry wrote "five" back and the form refused it.
+    broker.collect("Years of Python?", "text", reask=True)
+    broker.park(JOB)
+    assert len(client.sent) == 2
+    assert "Years of Python?" in client.sent[1]
+    assert broker.pop_ready() == ([], {})
+    assert broker.is_parked(JOB["id"])
+
+    reply(broker, 2, "5")
+    ready, answers = broker.pop_ready()
+    assert ready == [JOB]
+    assert [ans for _, ans in answers.values()] == ["5"]
+
+
+def test_numbered_and_plain_lines_are_parsed(answer_bank):
+    client = FakeTelegram()
+    broker = bot.QuestionBroker(client)
+    broker.collect("Years of Python?", "text")
+    broker.collect("Notice period?", "text")
+    broker.collect("Remote?", "radio", ["Select an option", "Yes", "No"])
+    broker.park(JOB)
+    assert "1. Yes / 2. No" in client.sent[0]
+
+    reply(broker, 1, "3) 1\nfive")
+    assert client.sent[-1] == "Thanks! Still waiting on: 2"
+    assert broker.is_parked(JOB["id"])
+    reply(broker, 1, "two weeks")
+    ready, answers = broker.pop_ready()
+    assert ready == [JOB]
+    assert {q["text"]: ans for q, ans in answers.values()} == {
+        "Years of Python?": "five", "Notice period?": "two weeks", "Remote?": "Yes"}
+
+
+def test_a_single_open_question_takes_the_whole_reply(answer_bank):
+    client = FakeTelegram()
+    broker = bot.QuestionBroker(client)
+    broker.collect("Cover letter?", "text")
+    broker.park(JOB)
+    reply(broker, 1, "Dear team,\nI would love to join.")
+    _, answers = broker.pop_ready()
+    assert [ans for _, ans in answers.values()] == ["Dear team,\nI would love to join."]
+
+
+def test_questions_shared_by_two_jobs_are_sent_once(answer_bank):
+    client = FakeTelegram()
+    broker = bot.QuestionBroker(client)
+    other = dict(JOB, id="43", title="Data Engineer")
+    for job in (JOB, other):
+        broker.collect("Years of Python?", "text")
+        broker.park(job)
+    assert len(client.sent) == 1
+    reply(broker, 1, "5")
+    assert broker.pop_ready()[0] == [JOB, other]
@@ -0,0 +1,40 @@
+import json
+
+import lnkedinbot as bot
+
+
+def engine(tmp_path, rules):
+    path = tmp_path / "answer_rules.json"
+    path.write_text(json.dumps({"rules": rules}))
+    return bot.RuleEngine(str(path))
+
+
+def question(text, qtype="text", options=None):
+    return {"text": text, "type": qtype, "options": options, "reask": False}
+
+
+def test_first_matching_rule_wins_and_fills_named_groups(tmp_path):
+    rules = engine(tmp_path, [
+        {"name": "search-box", "keywords": ["search"], "action": "skip"},
+        {"name": "years", "regex": r"how many years.*?(?P<skill>python|java)", "answer": "5", "types": ["text"]},
+        {"name": "skill", "regex": r"experience with (?P<skill>\w+)", "answer": "Yes, {skill}"},
+        {"name": "remote", "keywords": ["remote"], "options": ["Yes"]},
+    ])
+    assert rules.match(question("Search by title"))[1] is None
+    assert rules.match(question("How many years of Python?"))[1] == "5"
+    assert rules.match(question("How many years of Python?", "dropdown", ["1", "5"])) is None
+    assert rules.match(question("Any experience with Rust?")) == (rules.rules[2], "Yes, Rust")
+    assert rules.match(question("Open to remote?", "radio", ["Select an option", "Yes", "No"]))[1] == "Yes"
+    assert rules.match(question("Favourite colour?")) is None
+
+
+def test_bad_regex_and_backreferences_are_skipped(tmp_path):
+    rules = engine(tmp_path, [
+        {"name": "broken", "regex": "(unclosed", "answer": "x"},
+        {"name": "named-backref", "regex": r"(?P<w>\w+) (?P=w)", "answer": "x"},
+        {"name": "numbered-backref", "regex": r"(\w+) \1", "answer": "x"},
+        {"name": "ok", "keywords": ["sponsorship"], "answer": "No"},
+    ])
+    assert [r["name"] for r in rules.rules] == ["ok"]
+    assert rules.match(question("Do you need sponsorship?"))[1] == "No"
+    assert rules.match(question("very very long")) is None
@@ -0,0 +1,49 @@
+import json
+
+import lnkedinbot as bot
+
+
+def scheduler(tmp_path, **search):
+    config = tmp_path / "searches.json"
+    config.write_text(json.dumps({"searches": [dict({"keywords": "python"}, **search)]}))
+    return bot.SearchScheduler(str(config), str(tmp_path / "search_state.jsonl"))
+
+
+def test_window_covers_the_time_since_the_last_scan(tmp_path):
+    sched = scheduler(tmp_path, initial_window_hours=12)
+    search = sched.searches[0]
+    assert sched.window_seconds(search, 1_000_000) == 12 * 3600
+    sched.mark_scanned(search, 1_000_000)
+    # A bot that was down for three days looks back three days.
+    later = 1_000_000 + 3 * 86400
+    assert sched.window_seconds(search, later) == 3 * 86400 + bot.SEARCH_WINDOW_OVERLAP
+    assert sched.window_seconds(search, 1_000_000 + 60) == 3600
+
+
+def test_max_window_hours_caps_the_window(tmp_path):
+    sched = scheduler(tmp_path, max_window_hours=48)
+    search = sched.searches[0]
+    sched.mark_scanned(search, 1_000_000)
+    assert sched.window_seconds(search, 1_000_000 + 3 * 86400) == 48 * 3600
+
+
+def test_seen_ids_are_saved_as_one_record_per_page(tmp_path):
+    sched = scheduler(tmp_path)
+    search = sched.searches[0]
+    sched.save_seen(search, {"1", "2"})
+    sched.save_seen(search, {"3"})
+    sched.save_seen(search, set())
+    lines = (tmp_path / "search_state.jsonl").read_text().splitlines()
+    assert [json.loads(line)["v"]["ids"] for line in lines] == [["1", "2"], ["3"]]
+    reloaded = bot.SearchScheduler(str(tmp_path / "searches.json"), str(tmp_path / "search_state.jsonl"))
+    assert reloaded.seen_ids(search) == {"1", "2", "3"}
+
+
+def test_oldest_seen_page_is_overwritten_when_the_ring_is_full(tmp_path, monkeypatch):
+    monkeypatch.setattr(bot, "SEARCH_SEEN_SLOTS", 3)
+    sched = scheduler(tmp_path)
+    search = sched.searches[0]
+    for page in range(5):
+        sched.save_seen(search, {f"{page}a", f"{page}b"})
+    assert sched.seen_ids(search) == {"2a", "2b", "3a", "3b", "4a", "4b"}
+    assert sched.last_scan(search) is None
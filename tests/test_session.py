@@ -0,0 +1,40 @@
+import lnkedinbot as bot
+
+COOKIES = [{"name": "li_at", "value": "x", "domain": ".linkedin.com", "path": "/"}]
+
+
+class FakeDriver:
+    def __init__(self):
+        self.visited = []
+        self.cookies = []
+
+    def get(self, url):
+        self.visited.append(url)
+
+    def add_cookie(self, cookie):
+        self.cookies.append(cookie)
+
+
+def test_restored_session_is_checked(monkeypatch):
+    driver = FakeDriver()
+    logins = []
+    monkeypatch.setattr(bot, "driver", driver)
+    monkeypatch.setattr(bot, "CHROME_PROFILE_DIR", "")
+    monkeypatch.setattr(bot, "session_valid", lambda: True)
+    monkeypatch.setattr(bot, "log_in", lambda: logins.append(True))
+
+    bot.restore_session(COOKIES)
+    assert driver.visited == [bot.SESSION_CHECK_URL]
+    assert len(driver.cookies) == 1
+    assert logins == []
+
+
+def test_rejected_restored_session_falls_back_to_log_in(monkeypatch):
+    logins = []
+    monkeypatch.setattr(bot, "driver", FakeDriver())
+    monkeypatch.setattr(bot, "CHROME_PROFILE_DIR", "")
+    monkeypatch.setattr(bot, "session_valid", lambda: False)
+    monkeypatch.setattr(bot, "log_in", lambda: logins.append(True))
+
+    bot.restore_session(COOKIES)
+    assert logins == [True]